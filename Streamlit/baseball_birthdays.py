@@ -1,207 +1,72 @@
 import streamlit as st
 import pandas as pd
-import time
 import datetime
-import random
-import matplotlib.pyplot as plt
 import altair as alt
-import statistics
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from birthdays.charts import daily_chart_png
+from birthdays.dataset import DataStore
+from birthdays.days import MONTH_NAMES, day_of_year, month_and_day
+from birthdays.eras import PlayerFilter
+from birthdays.franchises import FRANCHISE_GRID
+from birthdays.ranges import zodiac_ranges
+from birthdays.ranking import rank_days
+from birthdays.timing import Profiler, cached, current, finish_run, log_summary, section_run, start_run
 
 st.set_page_config(
     page_title="MLB - Major League Birthdays",
     layout="wide",  # Use "wide" to expand the content to fill more of the screen
 )
 
-@st.cache_data
-def load_data():
-    month_lengths = [31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
-    month_names = ["January", "February", "March", "April", "May", "June", "July", "August", "September", "October", "November", "December"]
-    jan, feb, mar, apr, may, jun, jul, aug, sep, octo, nov, dec = [[], [], [], [], [], [], [], [],[], [], [], []]
-    all_data = [jan, feb, mar, apr, may, jun, jul, aug, sep, octo, nov, dec]
-
-    for i in range(12):
-        for j in range(month_lengths[i]):
-            all_data[i].append(pd.read_csv(f"Data/{month_names[i]}/{month_names[i]}_{str(j+1).zfill(2)}.csv"))
-
-    return all_data
-
-# Adds innings pitched data by converting the "outs" format to decimals, then back to outs
-# @param ip_list - list of innings pitched to sum
-# return - returns the sum of the innings in "outs" format
-def sum_ip(ip_list):
-    sum = 0
-    for ip in ip_list:
-        sum = sum + int(ip) + (ip % 1) * 10/3
-    
-    if sum % 1 < .995 and sum % 1 > 0.05:
-        return int(sum) + (sum % 1 * 3 / 10)
-    else:
-        return sum
-
-# Calculates each day's total or average of the parameter statistic and returns values in list form
-# @param all_data - list of lists containing dataframes for each day
-# @param stat_totals - string representing name of statistic
-# @param stat_list - list of totals or averages - overwritten each time to reduce memory strain
-# @param is_avg - boolean value representing whether the function should calculate totals (False) or average (True)
-# @param war_min - float representing the minimum WAR for the "Players Over _ WAR" calculation. Optional because not used for any other calculation
-# @return - lists representing the totals or averages for each day for the input statistic
-def calculate_total_or_avg_stats(all_data, stat_name, stat_list, is_avg, war_min=0):
-    month_lengths = [31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
-
-    stat_list = []
-
-    for i in range(12):
-        for j in range(month_lengths[i]):
-            if is_avg:
-                # All rate statistics need to have a weighted average
-                if stat_name == "BA":
-                    stat_list.append(all_data[i][j]["H"].sum() / all_data[i][j]["AB"].sum())
-
-                elif stat_name == "OBP":
-                    est_pa = (all_data[i][j]["AB"] + all_data[i][j]["BB"]).sum()
-                    est_times_ob = ((all_data[i][j]["AB"] + all_data[i][j]["BB"]) * all_data[i][j]["OBP"]).sum()
-                    stat_list.append(est_times_ob / est_pa)
-
-                elif stat_name == "SLG":
-                    total_bases = (all_data[i][j]["AB"] * all_data[i][j]["SLG"]).sum()
-                    stat_list.append(total_bases / all_data[i][j]["AB"].sum())
-
-                elif stat_name == "OPS":
-                    est_pa = (all_data[i][j]["AB"] + all_data[i][j]["BB"]).sum()
-                    est_ob_plus_tb = ((all_data[i][j]["AB"] + all_data[i][j]["BB"]) * all_data[i][j]["OPS"]).sum()
-                    stat_list.append(est_ob_plus_tb / est_pa)
-
-                elif stat_name == "ERA":
-                    stat_list.append(((all_data[i][j]["IP"] * all_data[i][j]["ERA"]).sum()) / all_data[i][j]["IP"].sum())
-
-                elif stat_name == "ERA+":
-                    stat_list.append(((all_data[i][j]["IP"] * all_data[i][j]["ERA+"]).sum()) / all_data[i][j]["IP"].sum())
-                
-                elif stat_name == "WHIP":
-                    stat_list.append(((all_data[i][j]["IP"] * all_data[i][j]["WHIP"]).sum()) / all_data[i][j]["IP"].sum())
-                
-                else:
-                    stat_list.append(statistics.mean(all_data[i][j][stat_name]))
-                    
-            else:
-                if stat_name == "Number of Players":
-                    stat_list.append(len(all_data[i][j]))
-                elif stat_name == "Players Over _ WAR":
-                    stat_list.append(len(all_data[i][j][all_data[i][j]["WAR"] > war_min]))
-                elif stat_name == "Hall of Famers":
-                    stat_list.append(len(all_data[i][j][all_data[i][j]["Name"].str.contains("HOF")]))
-                elif stat_name == "IP":
-                    stat_list.append(sum_ip(all_data[i][j]["IP"]))
-                else:
-                    # No rate stats or weird addition, totals are basic sum
-                    stat_list.append(all_data[i][j][stat_name].sum())
-                
-
-    return stat_list
-
-# Takes an int representing the day of the year and translates it into the month and day
-# @param day_of_year - int representing a number of days into the year
-# @return - a tuple containing the month and the day of the month
-def get_month_and_day(day_of_year):
-    day = day_of_year + 1 # Adjust for 0-indexed
-    month_lengths = [31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
-
-    for i in range(12):
-        if day <= month_lengths[i]:
-            return (i, day)
-        else:
-            day = day - month_lengths[i]
-
-# Returns a list of the 5 players born closest to the input date
-# @param all_data - list of lists containing dataframes for each day
-# @param date - datetime.date value representing the target day
-# return - a list of lists, with each sublist representing a player and containing name, WAR, and birthdate
-def find_5_closest_players(all_data, date):
-    closest = []
-    younger_than_all = False
-
-    # If the selected date is within 18 years of the current date, set to 18 years (give or take a day b/c leap years) before today, and set to only go backwards
-    # Saves calculation time
-    # Assumes no players younger than 18
-    if date.today() - date < datetime.timedelta(days = 365 * 18 + 4):
-        younger_than_all = True
-        date = date - datetime.timedelta(days = 365 * 18 + 4)
-
-    day = date.day
-    month = date.month
-    year = date.year
-
-    day_results = search_day(all_data, day, month, year)
-    if len(day_results.index) != 0:
-        for i in range(len(day_results)):
-            closest.append([day_results.loc[i, "Name"], day_results.loc[i, "WAR"], datetime.date(year, month, day)])
-
-    # Setup for the loop
-    next_day = [day, month, year]
-    prev_day = [day, month, year]
-
-    # Loop through days getting progressively farther away from the birthday until 5 players found
-    while len(closest) < 5:
-        if not younger_than_all:
-            next_day = add_day(next_day[0], next_day[1], next_day[2])
-            nextday_results = search_day(all_data, next_day[0], next_day[1], next_day[2])
-            if len(nextday_results.index) != 0:
-                for i in range(len(nextday_results)):
-                    closest.append([nextday_results.loc[i, "Name"], nextday_results.loc[i, "WAR"], datetime.date(next_day[2], next_day[1], next_day[0])])
-
-        prev_day = subtract_day(prev_day[0], prev_day[1], prev_day[2])
-        prevday_results = search_day(all_data, prev_day[0], prev_day[1], prev_day[2])
-        if len(prevday_results.index) != 0:
-            for i in range(len(prevday_results)):
-                closest.append([prevday_results.loc[i, "Name"], prevday_results.loc[i, "WAR"], datetime.date(prev_day[2], prev_day[1], prev_day[0])])
-
-    return closest
-
-# Returns all players born on the parameter day, month, and year. Empty DF if none
-# @param all_data - list of lists containing dataframes for each day
-# @param day - a number representing the day to search for
-# @param month - a number representing the month to search for
-# @param year - the year to search for
-# return - a dataframe containing all players born on the parameter day, month, and year, or empty if none were
-def search_day(all_data, day, month, year):
-    birthday_df = all_data[month-1][day-1]
-    return birthday_df[birthday_df["Born"] == year].reset_index()
-
-# Returns the day, month, and year of the date following the input date
-# @param day - the day
-# @param month - the month
-# @param year - the year
-# return - the day, month, and year of the date following the input date
-def add_day(day, month, year):
-    month_lengths = [31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
-    if day == 28 and month == 2 and year % 4 != 0:
-        # February 28 on a non-leap year is the end of the month
-        return [1, 3, year]
-    elif day < month_lengths[month-1]:
-        return [day + 1, month, year]
-    else:
-        if month < 12:
-            return [1, month + 1, year]
-        else:
-            return [1, 1, year + 1]
-        
-# Returns the day, month, and year of the date before the input date
-# @param day - the day
-# @param month - the month
-# @param year - the year
-# return - the day, month, and year of the date before the input date
-def subtract_day(day, month, year):
-    month_lengths = [31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
-    if day == 1 and month == 3 and year % 4 != 0:
-        # February 28 on a non-leap year is the end of the month
-        return [28, 2, year]
-    elif day > 1:
-        return [day - 1, month, year]
-    else:
-        if month > 1:
-            return [month_lengths[month-2], month-1, year]
-        else:
-            return [31, 12, year - 1]
+# Wall time, cache hits and misses, and data sizes of this rerun, for the debug panel (add ?debug=1 to the URL) and the log line at the end
+# Setting BIRTHDAYS_PROFILE to a directory also saves a cProfile capture of each rerun there
+timings = start_run()
+profiler = Profiler("rerun")
+profiler.start()
+
+# Every query the page makes goes through one BirthdayData, loaded once and shared across sessions without copying
+# It is memory-mapped, so every app process on a host shares one copy of the player table, prefix sums, and indexes
+@cached(st.cache_resource)
+def load_store():
+    return DataStore(mapped=True)
+
+# The BirthdayData of the newest data; once data_extraction.py writes new data, the next rerun loads only what changed
+def load_dataset():
+    return load_store().get()
+
+# Draws the graph of a statistic's total or average on each birthday as a PNG
+# Rendered PNGs are kept in a bounded cache shared across sessions, so a repeat view of the same graph is not drawn again
+# @param version - version of the data to draw from, which keys the cache so graphs of older data are not reused
+# @param _dataset - BirthdayData of that version, left out of the cache key
+# @param stat_label - string representing the statistic as shown in the selectbox, e.g. "Pitching Wins"
+# @param stat_name - string representing name of statistic, e.g. "W"
+# @param is_avg - boolean value representing whether to graph totals (False) or averages (True)
+# @param war_min - float representing the minimum WAR for the "Players Over _ WAR" graph
+# @param window - number of days in the rolling window the graph is smoothed over, 1 for no smoothing
+# @param players_filter - PlayerFilter of the players to include, or None for every player
+# return - bytes of the PNG image
+@cached(st.cache_data, max_entries=64)
+def render_daily_chart(version, _dataset, stat_label, stat_name, is_avg, war_min=0, window=1, players_filter=None):
+    values = _dataset.daily_values(stat_name, is_avg, war_min, window, players_filter)
+
+    notes = []
+    if _dataset.narrowing(players_filter) is not None:
+        notes.append(players_filter.describe())
+    if window > 1:
+        notes.append(f"{window}-day rolling")
+    label = f"{'Average' if is_avg else 'Total'} {stat_label}"
+    if notes:
+        label += f" ({', '.join(notes)})"
+    return daily_chart_png(values, label)
+
+# The players born on a day as the Player Table shows them, kept for recently viewed days of the given data version
+# @param version - version of the data, which keys the cache
+# @param _dataset - BirthdayData of that version, left out of the cache key
+@cached(st.cache_data, max_entries=32)
+def load_display_table(version, _dataset, month, day):
+    return _dataset.display_table(month, day)
 
 # --------------------------------------------------------------------------------------------------------------------------------------------------------------
 # --------------------------------------------------------------------------------------------------------------------------------------------------------------
@@ -215,7 +80,39 @@ st.subheader("Table of Contents")
 st.write("1. Individual Day Data - Select a birthday and view  players who were born on that day, plus some adjustable graphs")
 st.write("2. Group Statistics - Compare statistics across birthdays, with each day's players' statistics aggregated")
 
-all_data = load_data()
+timings.size("players_bytes", load_dataset().players.memory_usage().sum())
+
+# Dictionary to convert human-friendly stat names to column names
+stat_dict = {
+    "Number of Players": "Number of Players",
+    "WAR" : "WAR",
+    "Players Over _ WAR" : "Players Over _ WAR",
+    "All Star Games" : "ASG",
+    "Hall of Famers" : "Hall of Famers",
+    "Games Played (Batted)" : "G_bat",
+    "Games Played (Pitched)" : "G_pit",
+    "AB" : "AB",
+    "H" : "H",
+    "HR" : "HR",
+    "RBI" : "RBI",
+    "SB" : "SB",
+    "AVG" : "BA",
+    "OBP*" : "OBP",
+    "SLG" : "SLG",
+    "OPS*" : "OPS",
+    "IP" : "IP",
+    "Pitching Wins" : "W",
+    "Pitching Losses" : "L",
+    "ERA" : "ERA",
+    "ERA+": "ERA+",
+    "WHIP" : "WHIP",
+    "Saves" : "SV",
+    "K" : "SO"
+}
+
+# Statistics offered for totals and for averages
+total_stats = ("WAR", "Number of Players", "Players Over _ WAR", "All Star Games", "Hall of Famers", "Games Played (Batted)", "Games Played (Pitched)", "AB", "H", "HR", "RBI", "SB", "IP", "Pitching Wins", "Pitching Losses", "Saves", "K")
+average_stats = ("WAR", "All Star Games", "Games Played (Batted)", "Games Played (Pitched)", "AB", "H", "HR", "RBI", "SB", "AVG", "OBP*", "SLG", "OPS*", "IP", "Pitching Wins", "Pitching Losses", "ERA", "ERA+", "WHIP", "Saves", "K")
 
 
 if "individual_open" not in st.session_state:
@@ -224,332 +121,328 @@ if "individual_open" not in st.session_state:
 def open_individual():
     st.session_state.individual_open = True
 
-with st.expander("Individual Day Data", expanded=st.session_state.individual_open):
-
-    # --------------------------------------------------------------------------------------------------------------------------------------------------------------
-    st.subheader("Birthday Selection")
+# Shows a search result's day in the Individual Day Data section
+# The birthday picker starts in 1900, so players born earlier are shown on their birthday in 2024, a leap year like the day list
+# @param born - datetime.date value of the player's birthdate
+def jump_to_birthday(born):
+    st.session_state.bday = born if born.year >= 1900 else born.replace(year=2024)
+    open_individual()
+
+# Each section below is a fragment: changing one of its widgets reruns only that section, with the arguments it was last called with,
+# rather than the whole page. A section rerunning by itself logs its own timings
+# Each section gets the dataset once when it starts and draws everything from it, so nothing it shows mixes two versions of the data
+
+# Scatterplot of the chosen day's players
+# @param bday - datetime.date value representing the chosen birthday
+@st.fragment
+def scatterplot_section(bday):
+    with section_run("scatterplot_section", "fragment rerun"):
+        dataset = load_dataset()
+        selected_month = MONTH_NAMES[bday.month - 1]
+        # IP is stored in outs and plotted in innings
+        bday_df = dataset.day_table(bday.month, bday.day)
+        bday_df = bday_df.assign(IP=bday_df["IP"] / 3)
+
+        stat_scatterplot = st.selectbox(f"Statistic for {selected_month} {str(bday.day)} player scatterplot",
+                            ("WAR", "All Star Games", "Games Played (Batted)", "Games Played (Pitched)", "AB", "H", "HR", "RBI", "SB", "IP", "Pitching Wins", "Pitching Losses", "Saves", "K"))
+
+        st.write("Hover over data point for details")
+
+        stat_chart = (
+            alt.Chart(bday_df).mark_circle().encode(x=stat_dict[stat_scatterplot], y=alt.Y("Born", scale=alt.Scale(domain=[1830, bday_df["Born"].max()+5]), axis=alt.Axis(format="d")), tooltip=["Name", "Seasons", stat_dict[stat_scatterplot], "Born"])
+        )
+
+        # Vertical line at 0 - originally meant to separate +WAR players from -WAR players
+        zero_line = alt.Chart(pd.DataFrame({"x": [0]})).mark_rule(color="black", strokeWidth=0.75).encode(
+            x=alt.X("x:Q", axis=alt.Axis(title=f"Career {stat_dict[stat_scatterplot]}"))
+        )
+
+        st.altair_chart(stat_chart + zero_line)
+
+# Logo grid with the number of the chosen day's players who played for each franchise
+# @param bday - datetime.date value representing the chosen birthday
+@st.fragment
+def franchise_section(bday):
+    with section_run("franchise_section", "fragment rerun"):
+        dataset = load_dataset()
+        show_franchises = st.checkbox("Show franchise player counts (not recommended for mobile)", on_change=open_individual)
+
+        if show_franchises:
+
+            st.write(f"Number of players born on {MONTH_NAMES[bday.month - 1]} {str(bday.day)} to play for each franchise")
+
+            team_player_count = dataset.franchise_grid(day_of_year(bday.month, bday.day))
+
+            for i in range(11):
+                if i % 2 == 1:
+                    st.markdown(
+                        """
+                        <hr style="width: 85%; height: 1px; background-color: lightgrey; border: none; margin: 0 auto">
+                        """, 
+                        unsafe_allow_html=True)
+                
+                else:
+                    with st.container():
+                        cols = st.columns(11)
+                        for j in range(11):
+                            with cols[j]:
+                                if j % 2 == 1:
+                                    st.image(f"Logos/{FRANCHISE_GRID[i // 2][j // 2][1]}")
+                                    st.markdown(f"<div style='text-align:center; font-weight:bold;'>{team_player_count[i // 2][j // 2]}</div>", unsafe_allow_html=True)
+                                    st.write("\n")
 
-    month_names = ["January", "February", "March", "April", "May", "June", "July", "August", "September", "October", "November", "December"]
+@st.fragment
+def individual_day_section():
+    with section_run("individual_day_section", "fragment rerun"), st.expander("Individual Day Data", expanded=st.session_state.individual_open):
+        dataset = load_dataset()
 
-    bday = st.date_input("Choose birthday here", max_value=datetime.date(2024, 12, 31), min_value=datetime.date(1900, 1, 1), format="MM/DD/YYYY")
+        # --------------------------------------------------------------------------------------------------------------------------------------------------------------
+        st.subheader("Player Search")
 
-    selected_month = month_names[bday.month - 1]
+        query = st.text_input("Search for a player by name to jump to their birthday", placeholder="e.g. Jose Ramirez or Griffey", on_change=open_individual)
+        if query:
+            with current().section("search_players"):
+                found = dataset.search_players(query, 10)
 
-    bday_df = all_data[bday.month-1][bday.day-1]
+            if not found:
+                st.write("No players found")
+            for i, (name, war, born) in enumerate(found):
+                st.button(f"{name}  -  born {MONTH_NAMES[born.month - 1]} {born.day}, {born.year}  ({war} WAR)", key=f"search_result_{i}", on_click=jump_to_birthday, args=(born,))
 
-    # --------------------------------------------------------------------------------------------------------------------------------------------------------------
-    st.subheader("Player Table")
+        # --------------------------------------------------------------------------------------------------------------------------------------------------------------
+        st.subheader("Birthday Selection")
 
-    st.write("Career statistics of all players born on ", selected_month, str(bday.day))
-    st.write("Searchable and sortable - default is by birth year")
-    st.write("Players with \"HOF\" next to their name are in the Hall of Fame")
+        bday = st.date_input("Choose birthday here", max_value=datetime.date(2024, 12, 31), min_value=datetime.date(1900, 1, 1), format="MM/DD/YYYY", key="bday")
 
-    # Creating a copy to display the IP column with standard baseball notation without altering the underlying data
-    # Standard baseball notation has 1/3 of an inning as .1 and 2/3 of an inning as .2
-    bday_df_copy = bday_df.copy()
-    bday_df_copy["IP"] = bday_df_copy["IP"].apply(lambda x: int(x) + (x % 1 * 3 / 10) if x % 1 != 0 else int(x))
+        selected_month = MONTH_NAMES[bday.month - 1]
 
-    st.dataframe(bday_df_copy, column_config={
-        "Born": st.column_config.TextColumn(), 
-        "From": st.column_config.TextColumn(), 
-        "To": st.column_config.TextColumn()})
+        # --------------------------------------------------------------------------------------------------------------------------------------------------------------
+        st.subheader("Player Table")
 
-    # --------------------------------------------------------------------------------------------------------------------------------------------------------------
-    st.subheader("Figures")
-
-    # Dictionary to convert human-friendly stat names to column names
-    stat_dict = {
-        "Number of Players": "Number of Players",
-        "WAR" : "WAR",
-        "Players Over _ WAR" : "Players Over _ WAR",
-        "All Star Games" : "ASG",
-        "Hall of Famers" : "Hall of Famers",
-        "Games Played (Batted)" : "G_bat",
-        "Games Played (Pitched)" : "G_pit",
-        "AB" : "AB",
-        "H" : "H",
-        "HR" : "HR",
-        "RBI" : "RBI",
-        "SB" : "SB",
-        "AVG" : "BA",
-        "OBP*" : "OBP",
-        "SLG" : "SLG",
-        "OPS*" : "OPS",
-        "IP" : "IP",
-        "Pitching Wins" : "W",
-        "Pitching Losses" : "L",
-        "ERA" : "ERA",
-        "ERA+": "ERA+",
-        "WHIP" : "WHIP",
-        "Saves" : "SV",
-        "K" : "SO"
-    }
-
-    stat_scatterplot = st.selectbox(f"Statistic for {selected_month} {str(bday.day)} player scatterplot",
-                        ("WAR", "All Star Games", "Games Played (Batted)", "Games Played (Pitched)", "AB", "H", "HR", "RBI", "SB", "IP", "Pitching Wins", "Pitching Losses", "Saves", "K"))
-
-    st.write("Hover over data point for details")
-
-    stat_chart = (
-        alt.Chart(bday_df).mark_circle().encode(x=stat_dict[stat_scatterplot], y=alt.Y("Born", scale=alt.Scale(domain=[1830, bday_df["Born"].max()+5]), axis=alt.Axis(format="d")), tooltip=["Name", "Seasons", stat_dict[stat_scatterplot], "Born"])
-    )
-
-    # Vertical line at 0 - originally meant to separate +WAR players from -WAR players
-    zero_line = alt.Chart(pd.DataFrame({"x": [0]})).mark_rule(color="black", strokeWidth=0.75).encode(
-        x=alt.X("x:Q", axis=alt.Axis(title=f"Career {stat_dict[stat_scatterplot]}"))
-    )
-
-    st.altair_chart(stat_chart + zero_line)
+        st.write("Career statistics of all players born on ", selected_month, str(bday.day))
+        st.write("Searchable and sortable - default is by birth year")
+        st.write("Players with \"HOF\" next to their name are in the Hall of Fame")
 
-    # --------------------------------------------------------------------------------------------------------------------------------------------------------------
-    st.subheader("Bonus - Closest Player to Your Age")
-    st.text(f"Which players were born closest to {selected_month} {str(bday.day)}, {str(bday.year)}?")
-    closest_5 = find_5_closest_players(all_data, bday)
-    for i in range(len(closest_5)):
-        days_apart = (closest_5[i][2] - bday).days
+        # Shown from a copy with standard baseball notation for IP and "HOF" after names, without altering the underlying data
+        bday_df_copy = load_display_table(dataset.version, dataset, bday.month, bday.day)
+        current().size("day_rows", len(bday_df_copy))
 
-        day_s = "days"
+        st.dataframe(bday_df_copy, column_config={
+            "Born": st.column_config.TextColumn(), 
+            "From": st.column_config.TextColumn(), 
+            "To": st.column_config.TextColumn()})
 
-        if abs(days_apart) == 1:
-             day_s = "day"
+        # --------------------------------------------------------------------------------------------------------------------------------------------------------------
+        st.subheader("Similar Careers")
 
-        if days_apart == 0:
-            st.text(f"{i+1}.   {closest_5[i][0]}:    born {closest_5[i][2]}     ({closest_5[i][1]} WAR)      -      you are the exact same age!")
+        similar_to = st.selectbox("Find the players whose careers are most like", range(len(bday_df_copy)), index=None, format_func=lambda i: bday_df_copy["Name"].iloc[i], placeholder="Choose a player")
+        if similar_to is not None:
+            with current().section("similar_players"):
+                similar = dataset.similar_players(bday.month, bday.day, similar_to, 5)
+            for i, (name, war, born) in enumerate(similar):
+                st.button(f"{name}  -  born {MONTH_NAMES[born.month - 1]} {born.day}, {born.year}  ({war} WAR)", key=f"similar_result_{i}", on_click=jump_to_birthday, args=(born,))
 
-        else:
-            if days_apart > 0:
-                old_young = "older"
-            else:
-                old_young = "younger"
-            st.text(f"{i+1}.   {closest_5[i][0]}:    born {closest_5[i][2]}     ({closest_5[i][1]} WAR)      -      you are {abs(days_apart)} {day_s} {old_young}")
+        # --------------------------------------------------------------------------------------------------------------------------------------------------------------
+        st.subheader("Figures")
 
-    st.text("\n")
-    st.text("\n")
-    
-    # --------------------------------------------------------------------------------------------------------------------------------------------------------------
-    show_franchises = st.checkbox("Show franchise player counts (not recommended for mobile)", on_change=open_individual)
+        scatterplot_section(bday)
 
-    if show_franchises:
+        # --------------------------------------------------------------------------------------------------------------------------------------------------------------
+        st.subheader("Bonus - Closest Player to Your Age")
+        st.text(f"Which players were born closest to {selected_month} {str(bday.day)}, {str(bday.year)}?")
+        with current().section("closest_players"):
+            closest_5 = dataset.closest_players(bday, 5)
+        for i in range(len(closest_5)):
+            days_apart = (closest_5[i][2] - bday).days
 
-        st.write(f"Number of players born on {selected_month} {str(bday.day)} to play for each franchise")
-        
-        player_count_dict = {}
+            day_s = "days"
 
-        franchises_col_string = ','.join(bday_df_copy["Franchises"])
-        
-        for team in str.split(franchises_col_string, sep=","):
-            player_count_dict[team] = player_count_dict.get(team, 0) + 1
-
-        team_logos = [
-            ["BAL.png", "BOS.png", "NYY.png", "TB.png", "TOR.png"],
-            ["CHW.png", "CLE.png", "DET.png", "KC.png", "MIN.png"],
-            ["HOU.png", "LAA.png", "OAK.png", "SEA.png", "TEX.png"],
-            ["ATL.png", "MIA.png", "NYM.png", "PHI.png", "WAS.png"],
-            ["CHC.png", "CIN.png", "MIL.png", "PIT.png", "STL.png"],
-            ["ARI.png", "COL.png", "LAD.png", "SD.png", "SF.png"]
-        ]
-
-        team_player_count = [
-            [player_count_dict.get("BAL", 0), player_count_dict.get("BOS", 0), player_count_dict.get("NYY", 0), player_count_dict.get("TBD", 0), player_count_dict.get("TOR", 0)],
-            [player_count_dict.get("CHW", 0), player_count_dict.get("CLE", 0), player_count_dict.get("DET", 0), player_count_dict.get("KCR", 0), player_count_dict.get("MIN", 0)],
-            [player_count_dict.get("HOU", 0), player_count_dict.get("ANA", 0), player_count_dict.get("OAK", 0), player_count_dict.get("SEA", 0), player_count_dict.get("TEX", 0)],
-            [player_count_dict.get("ATL", 0), player_count_dict.get("FLA", 0), player_count_dict.get("NYM", 0), player_count_dict.get("PHI", 0), player_count_dict.get("WSN", 0)],
-            [player_count_dict.get("CHC", 0), player_count_dict.get("CIN", 0), player_count_dict.get("MIL", 0), player_count_dict.get("PIT", 0), player_count_dict.get("STL", 0)],
-            [player_count_dict.get("ARI", 0), player_count_dict.get("COL", 0), player_count_dict.get("LAD", 0), player_count_dict.get("SDP", 0), player_count_dict.get("SFG", 0)]
-        ]
-
-        for i in range(11):
-            if i % 2 == 1:
-                st.markdown(
-                    """
-                    <hr style="width: 85%; height: 1px; background-color: lightgrey; border: none; margin: 0 auto">
-                    """, 
-                    unsafe_allow_html=True)
-                
-            else:
-                with st.container():
-                    cols = st.columns(11)
-                    for j in range(11):
-                        with cols[j]:
-                            if j % 2 == 1:
-                                st.image(f"Logos/{team_logos[i // 2][j // 2]}")
-                                st.markdown(f"<div style='text-align:center; font-weight:bold;'>{team_player_count[i // 2][j // 2]}</div>", unsafe_allow_html=True)
-                                st.write("\n")
-                        
+            if abs(days_apart) == 1:
+                 day_s = "day"
 
-# --------------------------------------------------------------------------------------------------------------------------------------------------------------
-# --------------------------------------------------------------------------------------------------------------------------------------------------------------
+            if days_apart == 0:
+                st.text(f"{i+1}.   {closest_5[i][0]}:    born {closest_5[i][2]}     ({closest_5[i][1]} WAR)      -      you are the exact same age!")
 
-with st.expander("Group Statistics"):
-    st.subheader("Birthday Aggregated Graphs")
+            else:
+                if days_apart > 0:
+                    old_young = "older"
+                else:
+                    old_young = "younger"
+                st.text(f"{i+1}.   {closest_5[i][0]}:    born {closest_5[i][2]}     ({closest_5[i][1]} WAR)      -      you are {abs(days_apart)} {day_s} {old_young}")
 
-    # Totals
+        st.text("\n")
+        st.text("\n")
+        
+        # --------------------------------------------------------------------------------------------------------------------------------------------------------------
+        franchise_section(bday)
+
+# Graph of the chosen statistic's total on each birthday, with the top and bottom birthdays
+# @param list_length - number of birthdays to list
+# @param window - number of days the graph is smoothed over
+# @param players_filter - PlayerFilter of the players to include
+@st.fragment
+def totals_section(list_length, window, players_filter):
+    with section_run("totals_section", "fragment rerun"):
+        dataset = load_dataset()
+        stat_total = st.selectbox("Statistic for Totals graph", total_stats)
+        
+        if stat_total == "Players Over _ WAR":
+            war_min = st.number_input("Minimum WAR", min_value=-10.0, max_value=200.0, value=0.0, step=0.5, format="%0.1f")
+        else:
+            war_min = 0
 
-    stat_total = st.selectbox("Statistic for Totals graph",
-                        ("WAR", "Number of Players", "Players Over _ WAR", "All Star Games", "Hall of Famers", "Games Played (Batted)", "Games Played (Pitched)", "AB", "H", "HR", "RBI", "SB", "IP", "Pitching Wins", "Pitching Losses", "Saves", "K"))
-    
-    if stat_total == "Players Over _ WAR":
-        war_min = st.number_input("Minimum WAR", min_value=-10.0, max_value=200.0, value=0.0, step=0.5, format="%0.1f")
-    else:
-        war_min = 0
+        stat_totals = dataset.daily_values(stat_dict[stat_total], False, war_min, players_filter=players_filter)
 
-    # Initializing lists
-    totals = []
-    avgs = []
+        totals_chart = render_daily_chart(dataset.version, dataset, stat_total, stat_dict[stat_total], False, war_min, window, players_filter)
+        current().size("totals_chart_bytes", len(totals_chart))
+        st.image(totals_chart, width="stretch")
 
-    stat_totals = calculate_total_or_avg_stats(all_data, stat_dict[stat_total], totals, False, war_min)
+        for heading, ranked_days in [("Top", rank_days(stat_totals, list_length)), ("Bottom", rank_days(stat_totals, list_length, largest=False))]:
+            if heading == "Bottom":
+                st.text("\n")
 
-    plt.figure(figsize=(10, 3))
-    plt.xticks([0, 31, 60, 91, 121, 152, 182, 213, 244, 274, 305, 335], labels=["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"])
-    plt.xlabel("Birthday")
-    plt.ylabel(f"Total {stat_total}")
-    plt.title(f"Total {stat_total} For Each Birthday")
-    plt.plot(stat_totals)
+            if stat_total not in ["Number of Players", "Players Over _ WAR", "Hall of Famers"]:
+                st.write(f"**{heading} {list_length} birthdays by total {stat_total} (with top 3 contributors):**")
+            else:
+                st.write(f"**{heading} {list_length} birthdays by total {stat_total}:**")
+
+            for i, idx in enumerate(ranked_days):
+                m, d = month_and_day(idx)
+                st.text(f"{i+1}.  {MONTH_NAMES[m - 1]} {d}    --    {f'{stat_totals[idx]:.1f}'.rstrip('0').rstrip('.')}")
+
+                if stat_total == "Hall of Famers" and heading == "Top":
+                    st.caption(dataset.contributors_caption("Hall of Famers", idx, players_filter))
+                elif stat_total not in ["Number of Players", "Players Over _ WAR", "Hall of Famers"]:
+                    st.caption(dataset.contributors_caption(stat_dict[stat_total], idx, players_filter))
+
+# Graph of the chosen statistic's average on each birthday, with the top and bottom birthdays
+# @param list_length - number of birthdays to list
+# @param window - number of days the graph is smoothed over
+# @param players_filter - PlayerFilter of the players to include
+@st.fragment
+def averages_section(list_length, window, players_filter):
+    with section_run("averages_section", "fragment rerun"):
+        dataset = load_dataset()
+        stat_avg = st.selectbox("Statistic for Averages graph", average_stats)
+        if stat_avg in ["OBP*", "OPS*"]:
+            st.write("\* Due to lack of a Plate Appearances stat in the data, aggregated OBP and OPS are estimated based on a rough calculation of PA as AB + BB. This excludes HBP, IBB, and sacrifices, but should be close enough to the correct numbers on a large scale.")
+
+        stat_avgs = dataset.daily_values(stat_dict[stat_avg], True, players_filter=players_filter)
+
+        averages_chart = render_daily_chart(dataset.version, dataset, stat_avg, stat_dict[stat_avg], True, window=window, players_filter=players_filter)
+        current().size("averages_chart_bytes", len(averages_chart))
+        st.image(averages_chart, width="stretch")
+        
 
-    st.pyplot(plt.gcf())
 
-    stat_totals_l_to_h = sorted(stat_totals)
-    stat_totals_h_to_l = sorted(stat_totals, reverse=True)
+        # Lower is better for ERA and WHIP
+        higher_is_better = stat_avg not in ["ERA", "WHIP"]
 
-    if stat_total not in ["Number of Players", "Players Over _ WAR", "Hall of Famers"]:
-        st.write(f"**Top 5 birthdays by total {stat_total} (with top 3 contributors):**")
-    else:
-        st.write(f"**Top 5 birthdays by total {stat_total}:**")
-        
-    # Variable to keep track of previous index to avoid duplicates
-    idx = -1
+        for heading, ranked_days in [("Top", rank_days(stat_avgs, list_length, largest=higher_is_better)), ("Bottom", rank_days(stat_avgs, list_length, largest=not higher_is_better))]:
+            if heading == "Bottom":
+                st.text("\n")
 
-    for i in range(0, 5):
-        if i > 0 and stat_totals_h_to_l[i] == stat_totals_h_to_l[i-1] :
-            # If 2+ birthdays share a stat, ensure no duplicate date retrieval
-            idx = stat_totals.index(stat_totals_h_to_l[i], idx+1)
-        else:
-            # Current birthday stat is different from previous stat
-            idx = stat_totals.index(stat_totals_h_to_l[i])
-
-        m, d = get_month_and_day(idx)
-        st.text(f"{i+1}.  {month_names[m]} {d}    --    {f'{stat_totals_h_to_l[i]:.1f}'.rstrip('0').rstrip('.')}")
-
-        if stat_total == "Hall of Famers":
-            hofers = list(all_data[m][d-1][all_data[m][d-1]["Name"].str.contains("HOF")]["Name"])
-            hofers_string = f"{hofers[0][:-4]}"
-            for name in hofers[1:]:
-                hofers_string = hofers_string + f", {name[:-4]}" 
-
-            st.caption(hofers_string)
-        elif stat_total not in ["Number of Players", "Players Over _ WAR", "Hall of Famers"]:
-            top_daily_players = all_data[m][d-1].sort_values(stat_dict[stat_total], ascending=False).reset_index(drop=True)
-            top_daily_stats = list(top_daily_players.loc[0:3, stat_dict[stat_total]])
-
-            if stat_total == "IP":
-                top_daily_ip = [int(x) + (x % 1 * 3 / 10) if x % 1 != 0 else int(x) for x in top_daily_stats]
-                st.caption(f"""{top_daily_players.loc[0, 'Name']} ({top_daily_ip[0]}), 
-                           {top_daily_players.loc[1, 'Name']} ({top_daily_ip[1]}), 
-                           {top_daily_players.loc[2, 'Name']} ({top_daily_ip[2]})""")
-            else:
-                st.caption(f"""{top_daily_players.loc[0, 'Name']} ({top_daily_stats[0]}), 
-                           {top_daily_players.loc[1, 'Name']} ({top_daily_stats[1]}), 
-                           {top_daily_players.loc[2, 'Name']} ({top_daily_stats[2]})""")
-                   
-    st.text("\n")
-    if stat_total not in ["Number of Players", "Players Over _ WAR", "Hall of Famers"]:
-        st.write(f"**Bottom 5 birthdays by total {stat_total} (with top 3 contributors):**")
-    else:
-        st.write(f"**Bottom 5 birthdays by total {stat_total}:**")
-
-    # Variable to keep track of previous index to avoid duplicates 
-    idx = -1
-
-    for i in range(0, 5):
-        if i > 0 and stat_totals_l_to_h[i] == stat_totals_l_to_h[i-1] :
-            # If 2+ birthdays share a stat, ensure no duplicate date retrieval
-            idx = stat_totals.index(stat_totals_l_to_h[i], idx+1)
-        else:
-            # Current birthday stat is different from previous stat
-            idx = stat_totals.index(stat_totals_l_to_h[i])
+            st.write(f"**{heading} {list_length} birthdays by average {stat_avg}:**")
 
-        m, d = get_month_and_day(idx)
-        st.text(f"{i+1}.  {month_names[m]} {d}    --    {f'{stat_totals_l_to_h[i]:.1f}'.rstrip('0').rstrip('.')}")
+            for i, idx in enumerate(ranked_days):
+                m, d = month_and_day(idx)
+                st.text(f"{i+1}.  {MONTH_NAMES[m - 1]} {d}    --    {stat_avgs[idx]:.3f}")
 
-        if stat_total not in ["Number of Players", "Players Over _ WAR", "Hall of Famers"]:
-            top_daily_players = all_data[m][d-1].sort_values(stat_dict[stat_total], ascending=False).reset_index(drop=True)
-            top_daily_stats = list(top_daily_players.loc[0:3, stat_dict[stat_total]])
+# Totals and averages over every player born in a range of days: a custom range, or each zodiac sign
+# @param players_filter - PlayerFilter of the players to include
+@st.fragment
+def birthday_ranges_section(players_filter):
+    with section_run("birthday_ranges_section", "fragment rerun"):
+        dataset = load_dataset()
+        st.subheader("Birthday Ranges")
 
-            if stat_total == "IP":
-                top_daily_ip = [int(x) + (x % 1 * 3 / 10) if x % 1 != 0 else int(x) for x in top_daily_stats]
-                st.caption(f"""{top_daily_players.loc[0, 'Name']} ({top_daily_ip[0]}), 
-                           {top_daily_players.loc[1, 'Name']} ({top_daily_ip[1]}), 
-                           {top_daily_players.loc[2, 'Name']} ({top_daily_ip[2]})""")
-            else:
-                st.caption(f"""{top_daily_players.loc[0, 'Name']} ({top_daily_stats[0]}), 
-                           {top_daily_players.loc[1, 'Name']} ({top_daily_stats[1]}), 
-                           {top_daily_players.loc[2, 'Name']} ({top_daily_stats[2]})""")
+        range_kind = st.radio("Compare", ("Custom range", "Zodiac signs"), horizontal=True)
 
+        if range_kind == "Custom range":
+            st.write("Ranges ending before they start wrap around the new year. The year is ignored")
+            cols = st.columns(2)
+            with cols[0]:
+                start = st.date_input("From", value=datetime.date(2024, 6, 20), min_value=datetime.date(2024, 1, 1), max_value=datetime.date(2024, 12, 31), format="MM/DD/YYYY")
+            with cols[1]:
+                end = st.date_input("To", value=datetime.date(2024, 7, 10), min_value=datetime.date(2024, 1, 1), max_value=datetime.date(2024, 12, 31), format="MM/DD/YYYY")
+            start_day, end_day = day_of_year(start.month, start.day), day_of_year(end.month, end.day)
 
+            st.write(f"**Players born from {MONTH_NAMES[start.month - 1]} {start.day} to {MONTH_NAMES[end.month - 1]} {end.day}:**")
+            range_table = pd.DataFrame({
+                "Statistic": list(dict.fromkeys(total_stats + average_stats)),
+            })
+            range_table = range_table[range_table["Statistic"] != "Players Over _ WAR"]
+            range_table["Total"] = [round(dataset.range_value(stat_dict[stat], False, start_day, end_day, players_filter=players_filter), 1) if stat in total_stats else None for stat in range_table["Statistic"]]
+            range_table["Average"] = [round(dataset.range_value(stat_dict[stat], True, start_day, end_day, players_filter=players_filter), 3) if stat in average_stats else None for stat in range_table["Statistic"]]
+            st.dataframe(range_table, hide_index=True)
 
-    st.text("\n")
-    st.text("\n")
-    # Averages
+        else:
+            stat_zodiac = st.selectbox("Statistic for zodiac signs", [stat for stat in average_stats if stat in total_stats])
 
-    stat_avg = st.selectbox("Statistic for Averages graph",
-                        ("WAR", "All Star Games", "Games Played (Batted)", "Games Played (Pitched)", "AB", "H", "HR", "RBI", "SB", "AVG", "OBP*", "SLG", "OPS*", "IP", "Pitching Wins", "Pitching Losses", "ERA", "ERA+", "WHIP", "Saves", "K"))
-    if stat_avg in ["OBP*", "OPS*"]:
-        st.write("\* Due to lack of a Plate Appearances stat in the data, aggregated OBP and OPS are estimated based on a rough calculation of PA as AB + BB. This excludes HBP, IBB, and sacrifices, but should be close enough to the correct numbers on a large scale.")
+            zodiac_table = pd.DataFrame([{
+                "Sign": name,
+                "Birthdays": f"{MONTH_NAMES[month_and_day(start_day)[0] - 1][:3]} {month_and_day(start_day)[1]} - {MONTH_NAMES[month_and_day(end_day)[0] - 1][:3]} {month_and_day(end_day)[1]}",
+                "Players": int(dataset.range_value("Number of Players", False, start_day, end_day, players_filter=players_filter)),
+                f"Total {stat_zodiac}": round(dataset.range_value(stat_dict[stat_zodiac], False, start_day, end_day, players_filter=players_filter), 1),
+                f"Average {stat_zodiac}": round(dataset.range_value(stat_dict[stat_zodiac], True, start_day, end_day, players_filter=players_filter), 3),
+            } for name, start_day, end_day in zodiac_ranges()])
+            st.dataframe(zodiac_table, hide_index=True)
 
-    stat_avgs = calculate_total_or_avg_stats(all_data, stat_dict[stat_avg], avgs, True)
+# The sliders and filters change both graphs, so they rerun the whole Group Statistics section; the statistic selectboxes rerun only their own graph
+@st.fragment
+def group_statistics_section():
+    with section_run("group_statistics_section", "fragment rerun"), st.expander("Group Statistics"):
+        dataset = load_dataset()
+        st.subheader("Birthday Aggregated Graphs")
 
-    plt.figure(figsize=(10, 3))
-    plt.xticks([0, 31, 60, 91, 121, 152, 182, 213, 244, 274, 305, 335], labels=["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"])
-    plt.xlabel("Birthday")
-    plt.ylabel(f"Average {stat_avg}")
-    plt.title(f"Average {stat_avg} For Each Birthday")
-    plt.plot(stat_avgs)
+        list_length = st.slider("Number of birthdays to list", min_value=5, max_value=25, value=5, step=5)
+        # Smoothing only changes the graphs; the lists always rank single birthdays
+        window = st.slider("Smooth graphs over a rolling window of days (1 for no smoothing)", min_value=1, max_value=31, value=1, step=2)
 
-    st.pyplot(plt.gcf())
-    
+        # Every graph, list, and range below covers only the players these select
+        first_year, last_year = dataset.birth_years
+        birth_years = st.slider("Birth years", min_value=first_year, max_value=last_year, value=(first_year, last_year))
+        cols = st.columns(2)
+        with cols[0]:
+            hof_only = st.checkbox("Hall of Famers only")
+        with cols[1]:
+            pitchers_only = st.checkbox("Pitchers only (at least one game pitched)")
+        players_filter = PlayerFilter(birth_years[0], birth_years[1], hof_only, pitchers_only)
 
+        # Totals
 
-    stat_avgs_l_to_h = sorted(stat_avgs)
-    stat_avgs_h_to_l = sorted(stat_avgs, reverse=True)
+        totals_section(list_length, window, players_filter)
 
-    if stat_avg in ["ERA", "WHIP"]:
-        good = stat_avgs_l_to_h
-        bad = stat_avgs_h_to_l
-    else:
-        good = stat_avgs_h_to_l
-        bad = stat_avgs_l_to_h
+        st.text("\n")
+        st.text("\n")
+        # Averages
 
+        averages_section(list_length, window, players_filter)
 
-    st.write(f"**Top 5 birthdays by average {stat_avg}:**")
+        st.text("\n")
+        st.text("\n")
 
-    # Variable to keep track of previous index to avoid duplicates 
-    idx = -1
+        birthday_ranges_section(players_filter)
 
-    for i in range(0, 5):
-        if i > 0 and good[i] == good[i-1] :
-            # If 2+ birthdays share a stat, ensure no duplicate date retrieval
-            idx = stat_avgs.index(good[i], idx+1)
-        else:
-            # Current birthday stat is different from previous stat
-            idx = stat_avgs.index(good[i])
+# The run is ended even when a widget change interrupts the script, so a fragment rerunning later on this thread records its own timings
+try:
+    individual_day_section()
 
-        m, d = get_month_and_day(idx)
-        st.text(f"{i+1}.  {month_names[m]} {d}    --    {good[i]:.3f}")
+    # --------------------------------------------------------------------------------------------------------------------------------------------------------------
+    # --------------------------------------------------------------------------------------------------------------------------------------------------------------
 
-    
-    st.text("\n")
-    st.write(f"**Bottom 5 birthdays by average {stat_avg}:**")
+    group_statistics_section()
 
-    # Variable to keep track of previous index to avoid duplicates 
-    idx = -1
+    # --------------------------------------------------------------------------------------------------------------------------------------------------------------
+    # --------------------------------------------------------------------------------------------------------------------------------------------------------------
+finally:
+    profiler.stop()
+    profiler.save()
 
-    for i in range(0, 5):
-        if i > 0 and bad[i] == bad[i-1] :
-            # If 2+ birthdays share a stat, ensure no duplicate date retrieval
-            idx = stat_avgs.index(bad[i], idx+1)
-        else:
-            # Current birthday stat is different from previous stat
-            idx = stat_avgs.index(bad[i])
+    rerun_summary = timings.summary()
+    log_summary("rerun", rerun_summary)
+    finish_run()
 
-        m, d = get_month_and_day(idx)
-        st.text(f"{i+1}.  {month_names[m]} {d}    --    {bad[i]:.3f}")
+if st.query_params.get("debug") == "1":
+    with st.expander("Debug - rerun timings"):
+        st.json(rerun_summary)
@@ -0,0 +1,58 @@
+# Compares parse time and peak memory of the streaming birthdays parser against the previous pd.read_html parser
+# Runs offline on the synthetic pages in benchmarks/fixtures, generated from Data/ by make_fixtures.py rather than saved from the site
+# Run from the repository root: python benchmarks/bench_parse.py
+
+import glob
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data_extraction import parse_birthdays
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# The parser data_extraction.py used before parse_birthdays, kept here as the point of comparison
+def parse_birthdays_read_html(html):
+    table = pd.DataFrame(pd.read_html(io.BytesIO(html), encoding="utf-8")[0])
+    table = table.drop(columns=["Rk", "H.1", "HR.1", "BB.1"]).rename(columns={"Yrs": "Seasons", "G": "G_bat", "G.1": "G_pit"}).fillna(0)
+    table = table.astype({"R": "int", "H": "int", "HR": "int", "RBI": "int", "SB": "int", "BB": "int", "OPS+": "int", "W": "int", "L": "int", "G_pit": "int", "GS": "int", "SV": "int", "SO": "int"})
+    table["IP"] = table["IP"].astype(int) + table["IP"] * 10 % 5 / 3
+    return table
+
+# Times a parser on one page
+# @param parser - function taking the page's bytes
+# @param html - bytes of a birthdays page
+# @param repeats - number of timed runs
+# return - tuple of the best time in seconds and the peak memory in bytes
+def measure(parser, html, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        parser(html)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    parser(html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return best, peak
+
+if __name__ == "__main__":
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+    for path in sorted(glob.glob(os.path.join(FIXTURE_DIR, "*.html"))):
+        with open(path, "rb") as f:
+            html = f.read()
+
+        old_time, old_peak = measure(parse_birthdays_read_html, html, repeats)
+        new_time, new_peak = measure(parse_birthdays, html, repeats)
+
+        print(f"{os.path.basename(path)} ({len(html) / 1024:.0f} KB)")
+        print(f"    pd.read_html:     {old_time * 1000:7.2f} ms   peak {old_peak / 1024:8.0f} KB")
+        print(f"    parse_birthdays:  {new_time * 1000:7.2f} ms   peak {new_peak / 1024:8.0f} KB   ({old_time / new_time:.1f}x faster, {old_peak / new_peak:.1f}x less memory)")
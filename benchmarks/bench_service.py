@@ -0,0 +1,100 @@
+# Load-tests the JSON query service locally
+# Starts the service in its own process (or uses --url for one already running), then sends a mix of queries
+# over keep-alive connections from several client processes and reports requests per second and latency percentiles
+# Run from the repository root: python benchmarks/bench_service.py [--clients 4] [--seconds 10] [--url http://127.0.0.1:8000]
+
+import argparse
+import concurrent.futures
+import http.client
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import urllib.parse
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Query mix, roughly how a frontend would browse: days, closest players, and daily graphs
+def query_mix(rng):
+    month = rng.randint(1, 12)
+    day = rng.randint(1, 28)
+    choice = rng.random()
+    if choice < 0.4:
+        return f"/players?month={month}&day={day}"
+    if choice < 0.7:
+        return f"/closest?date={rng.randint(1900, 2024)}-{month:02}-{day:02}&k=5"
+    if choice < 0.95:
+        stat, kind = rng.choice([("WAR", "total"), ("HR", "total"), ("Hall of Famers", "total"), ("ERA", "average"), ("OPS", "average")])
+        return f"/daily?stat={urllib.parse.quote(stat)}&kind={kind}"
+    return "/health"
+
+# Sends queries over one keep-alive connection for a number of seconds
+# @param url - base url of the service
+# @param seconds - how long to send queries
+# @param seed - seed for the query mix
+# @param revalidate - True to send If-None-Match with the ETag from earlier responses, as a caching client would
+# return - list of request latencies in seconds
+def run_client(url, seconds, seed, revalidate):
+    rng = random.Random(seed)
+    address = urllib.parse.urlsplit(url)
+    connection = http.client.HTTPConnection(address.hostname, address.port)
+    headers = {}
+    latencies = []
+
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        start = time.perf_counter()
+        connection.request("GET", query_mix(rng), headers=headers)
+        response = connection.getresponse()
+        response.read()
+        latencies.append(time.perf_counter() - start)
+        if revalidate and response.getheader("ETag"):
+            headers = {"If-None-Match": response.getheader("ETag")}
+
+    connection.close()
+    return latencies
+
+# Starts the service on a free port and waits until it answers
+# return - tuple of the service's process and its base url
+def start_service():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+
+    process = subprocess.Popen([sys.executable, "-m", "birthdays.service", "--port", str(port)], cwd=ROOT)
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(600):
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            connection.request("GET", "/health")
+            connection.getresponse().read()
+            return process, url
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("the service did not start")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test the JSON query service")
+    parser.add_argument("--url", help="base url of a running service; by default one is started")
+    parser.add_argument("--clients", type=int, default=4, help="client processes, each with one keep-alive connection (default 4)")
+    parser.add_argument("--seconds", type=float, default=10, help="length of the test (default 10)")
+    parser.add_argument("--revalidate", action="store_true", help="send If-None-Match so unchanged responses come back as 304")
+    args = parser.parse_args()
+
+    process, url = (None, args.url) if args.url else start_service()
+    try:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=args.clients) as executor:
+            runs = [executor.submit(run_client, url, args.seconds, seed, args.revalidate) for seed in range(args.clients)]
+            latencies = np.concatenate([run.result() for run in runs])
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    print(f"{len(latencies)} requests in {args.seconds:g}s from {args.clients} clients: {len(latencies) / args.seconds:.0f} requests/s")
+    print(f"latency p50 {np.percentile(latencies, 50) * 1000:.2f} ms   p99 {np.percentile(latencies, 99) * 1000:.2f} ms   max {latencies.max() * 1000:.2f} ms")
@@ -0,0 +1,187 @@
+# Benchmarks the app and extraction hot paths offline against the committed Data/ tree and the synthetic pages make_fixtures.py
+# writes to benchmarks/fixtures
+# Covers loading the data cold, every daily stat aggregation, closest-player queries over dates from 1900 to today,
+# similar-career queries, top/bottom ranking, and scraper parse throughput
+# Results are written as JSON and, when a baseline is given, compared against it; the run fails if any case's median got slower
+# than the threshold by more than a minimum absolute change, so the jitter of sub-millisecond cases is not reported
+# Timings only compare on the same machine, so baselines are not committed: benchmarks/results/ is ignored by git, and a baseline is
+# recorded from the commit to compare against, on the machine that runs the comparison. Run from the repository root:
+#     git checkout <base commit>
+#     python benchmarks/bench_suite.py --save-baseline           (record benchmarks/results/baseline.json)
+#     git checkout <commit to check>
+#     python benchmarks/bench_suite.py --baseline benchmarks/results/baseline.json
+
+import argparse
+import datetime
+import glob
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from birthdays.aggregates import aggregate_stats, count_players_over_war, load_cube, outs_to_notation, top_contributors
+from birthdays.dataset import BirthdayData
+from birthdays.franchises import franchise_day_counts
+from birthdays.mapped import load_players
+from birthdays.nearest import BirthdateIndex
+from birthdays.ranking import rank_days
+from birthdays.similar import SimilarityIndex
+from data_extraction import parse_birthdays
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURE_DIR = os.path.join(BENCH_DIR, "fixtures")
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+PLAYERS_PATH = "Data/birthdays.parquet"
+
+# Statistics offered by the app's Totals and Averages graphs, as column names
+TOTAL_STATS = ["Number of Players", "WAR", "ASG", "Hall of Famers", "G_bat", "G_pit", "AB", "H", "HR", "RBI", "SB", "IP", "W", "L", "SV", "SO"]
+AVG_STATS = ["WAR", "ASG", "G_bat", "G_pit", "AB", "H", "HR", "RBI", "SB", "BA", "OBP", "SLG", "OPS", "IP", "W", "L", "ERA", "ERA+", "WHIP", "SV", "SO"]
+
+# Least total time spent timing a case; fast cases are run more than the requested repeats until they reach it, so their medians are stable
+MIN_CASE_S = 0.5
+
+# Most timed runs of one case
+MAX_REPEATS = 1000
+
+# Times a function over several runs
+# @param func - function taking no arguments
+# @param repeats - least number of timed runs
+# @param warm_up - whether to make one untimed run first; off for work done only once per process, like the first read of a file
+# return - dictionary with the best and median time in seconds and the number of runs
+def measure(func, repeats, warm_up=True):
+    if warm_up:
+        func()
+    times = []
+    while len(times) < repeats or (sum(times) < MIN_CASE_S and len(times) < MAX_REPEATS):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return {"best_s": min(times), "median_s": statistics.median(times), "repeats": len(times)}
+
+# Every week from the start of 1900 to today, the range of the app's date picker
+def sweep_dates():
+    return np.arange(np.datetime64("1900-01-01"), np.datetime64(datetime.date.today()), np.timedelta64(7, "D"))
+
+# Runs every benchmark case
+# @param repeats - number of timed runs per case
+# return - dictionary mapping case name to its timings, plus extra throughput figures for some cases
+def run_suite(repeats):
+    results = {}
+
+    # Cold load
+    results["load/read_players"] = measure(lambda: pd.read_parquet(PLAYERS_PATH), repeats, warm_up=False)
+    results["load/read_cube"] = measure(load_cube, repeats, warm_up=False)
+    mapped = BirthdayData(mapped=True).mapped
+    results["load/map_players"] = measure(lambda: load_players(mapped), repeats, warm_up=False)
+    results["load/mapped_dataset"] = measure(lambda: BirthdayData(mapped=True).name_index, repeats, warm_up=False)
+    dataset = BirthdayData()
+    players = dataset.players
+    results["load/split_by_day"] = measure(lambda: BirthdayData.day_tables.func(dataset), repeats)
+
+    # Aggregation, as data_extraction.py precomputes it and as the app looks it up
+    results["aggregate/all_stats"] = measure(lambda: aggregate_stats(players), repeats)
+    results["aggregate/top_contributors"] = measure(lambda: top_contributors(players), repeats)
+    results["aggregate/franchise_counts"] = measure(lambda: franchise_day_counts(players), repeats)
+    for war_min in [0.0, 20.0, 60.0]:
+        results[f"aggregate/players_over_war/{war_min:g}"] = measure(lambda: count_players_over_war(players, war_min), repeats)
+
+    totals, avgs, _ = load_cube()
+    outs_sums = players["IP"].astype("int64").groupby(players["day_of_year"]).sum().to_numpy()
+    results["aggregate/outs_to_notation"] = measure(lambda: outs_to_notation(outs_sums), repeats)
+
+    # Top and bottom birthdays for every graph option, at the slider's smallest and largest list lengths
+    for k in [5, 25]:
+        results[f"ranking/totals/top_bottom_{k}"] = measure(lambda: [(rank_days(totals[stat], k), rank_days(totals[stat], k, largest=False)) for stat in TOTAL_STATS], repeats)
+        results[f"ranking/averages/top_bottom_{k}"] = measure(lambda: [(rank_days(avgs[stat], k), rank_days(avgs[stat], k, largest=False)) for stat in AVG_STATS], repeats)
+
+    # Closest players over a sweep of dates, one query at a time as the app asks and all at once
+    dates = sweep_dates()
+    results["nearest/build_index"] = measure(lambda: BirthdateIndex(players), repeats)
+    index = BirthdateIndex(players)
+    results["nearest/sweep_single"] = measure(lambda: [index.nearest(date, 5) for date in dates], repeats)
+    results["nearest/sweep_single"]["queries"] = len(dates)
+    results["nearest/sweep_batch"] = measure(lambda: index.nearest_batch(dates, 5), repeats)
+    results["nearest/sweep_batch"]["queries"] = len(dates)
+
+    # Most similar careers, for a spread of players one at a time as the app asks, and for every player as data_extraction.py precomputes them
+    results["similar/build_index"] = measure(lambda: SimilarityIndex(players), repeats)
+    similarity = SimilarityIndex(players)
+    rows = np.linspace(0, len(players) - 1, 200).astype(int)
+    results["similar/single"] = measure(lambda: [similarity.similar(row, 5) for row in rows], repeats)
+    results["similar/single"]["queries"] = len(rows)
+    # Seconds per run, so it is timed once
+    results["similar/batch"] = measure(similarity.similar_batch, 1, warm_up=False)
+    results["similar/batch"]["queries"] = len(players)
+
+    # Scraper parse throughput on the saved pages
+    for path in sorted(glob.glob(os.path.join(FIXTURE_DIR, "*.html"))):
+        with open(path, "rb") as f:
+            html = f.read()
+        name = f"parse/{os.path.splitext(os.path.basename(path))[0]}"
+        results[name] = measure(lambda: parse_birthdays(html), repeats)
+        results[name]["rows_per_s"] = len(parse_birthdays(html)) / results[name]["best_s"]
+        results[name]["mb_per_s"] = len(html) / 1e6 / results[name]["best_s"]
+
+    return results
+
+# Compares a run against a baseline run by each case's median time
+# @param results - dictionary of case timings from run_suite
+# @param baseline - dictionary of case timings from an earlier run on the same machine
+# @param threshold - allowed slowdown as a fraction, e.g. 0.25 allows a case to take up to 25% longer
+# @param min_change_s - smallest slowdown in seconds reported, however large as a fraction
+# return - list of (case, baseline seconds, current seconds, ratio) for every case slower than both limits
+def find_regressions(results, baseline, threshold, min_change_s):
+    regressions = []
+    for name, timing in results.items():
+        if name not in baseline:
+            continue
+        before, after = baseline[name]["median_s"], timing["median_s"]
+        if after > before * (1 + threshold) and after - before > min_change_s:
+            regressions.append((name, before, after, after / before))
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the extraction and app hot paths")
+    parser.add_argument("--repeats", type=int, default=10, help="least timed runs per case; fast cases run until they take 0.5 s (default 10)")
+    parser.add_argument("--output", default=os.path.join(RESULTS_DIR, "latest.json"), help="where to write the results")
+    parser.add_argument("--baseline", help="results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown of a median before a case counts as a regression (default 0.25)")
+    parser.add_argument("--min-change-ms", type=float, default=5.0, help="smallest slowdown of a median counted as a regression (default 5 ms)")
+    parser.add_argument("--save-baseline", action="store_true", help="also write the results to benchmarks/results/baseline.json")
+    args = parser.parse_args()
+
+    results = run_suite(args.repeats)
+    report = {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "machine": platform.platform(),
+        "results": results,
+    }
+
+    outputs = [args.output] + ([os.path.join(RESULTS_DIR, "baseline.json")] if args.save_baseline else [])
+    for output in outputs:
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    for name, timing in results.items():
+        print(f"{name:40} {timing['best_s'] * 1000:10.3f} ms   (median {timing['median_s'] * 1000:.3f} ms)")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+
+        regressions = find_regressions(results, baseline, args.threshold, args.min_change_ms / 1000)
+        print(f"\nCompared with {args.baseline} (medians, threshold +{args.threshold:.0%} and +{args.min_change_ms:g} ms): {len(regressions)} regression(s)")
+        for name, before, after, ratio in regressions:
+            print(f"    {name:36} {before * 1000:10.3f} ms -> {after * 1000:10.3f} ms   ({ratio:.2f}x)")
+        if regressions:
+            sys.exit(1)
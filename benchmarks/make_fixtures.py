@@ -0,0 +1,71 @@
+# Rebuilds offline HTML fixtures of the birthdays page from the CSVs in Data/
+# The fixtures are synthetic: they are generated from the scraped data, not saved copies of Baseball Reference pages, so they carry
+# none of the real page's navigation, scripts, or other markup, and parse timings on them understate the time on a real page
+# The pages follow the layout parse_birthdays() reads: one header row in thead, repeated G/H/HR/BB names for the pitching columns,
+# blank pitching cells for position players, IP in .1/.2 notation, and extra tables in comments and after the birthdays table
+# Run from the repository root: python benchmarks/make_fixtures.py [month day ...]
+
+import html
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data_extraction import day_path, read_day_csv
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# Days saved by default: a typical day, the smallest day, and a day with a float column in its CSV
+DEFAULT_DAYS = [(7, 4), (2, 29), (5, 30)]
+
+PAGE_COLUMNS = ["Rk", "Name", "Born", "Yrs", "From", "To", "WAR", "ASG", "G", "AB", "R", "H", "HR", "RBI", "SB", "BB", "BA", "OBP", "SLG", "OPS", "OPS+",
+                "W", "L", "ERA", "ERA+", "WHIP", "G", "GS", "SV", "IP", "H", "HR", "BB", "SO", "Franchises"]
+
+PITCHING_COLUMNS = ["W", "L", "ERA", "ERA+", "WHIP", "G_pit", "GS", "SV"]
+
+# Builds the HTML of one day's birthdays page
+# @param month - the month
+# @param day - the day
+# return - the page as a string
+def birthdays_page(month, day):
+    players = read_day_csv(day_path(month, day))
+    outs = players["IP"]
+
+    rows = []
+    for i, player in players.iterrows():
+        pitched = player["G_pit"] > 0
+
+        def cell(value, show=True):
+            return f"<td>{html.escape(str(value))}</td>" if show else "<td></td>"
+
+        name = player["Name"]
+        name_cell = f'<td><a href="/players/{i}.shtml">{html.escape(name.removesuffix(" HOF"))}</a>{" HOF" if name.endswith(" HOF") else ""}</td>'
+        batting = [cell(player[column]) for column in ["Born", "Seasons", "From", "To", "WAR", "ASG", "G_bat", "AB", "R", "H", "HR", "RBI", "SB", "BB", "BA", "OBP", "SLG", "OPS", "OPS+"]]
+        pitching = [cell(player[column], pitched) for column in PITCHING_COLUMNS]
+        pitching.append(cell(f"{outs[i] // 3}.{outs[i] % 3}", pitched))
+        # Hits, home runs, and walks allowed are not kept in the CSVs
+        pitching += [cell(0, pitched)] * 3 + [cell(player["SO"], pitched)]
+
+        rows.append(f'<tr><th scope="row">{i + 1}</th>{name_cell}{"".join(batting)}{"".join(pitching)}{cell(player["Franchises"])}</tr>')
+
+    header = "".join(f'<th scope="col">{column}</th>' for column in PAGE_COLUMNS)
+    return f"""<!DOCTYPE html>
+<html lang="en"><head><meta charset="utf-8"><title>Baseball Birthdays</title><script>var template = "<table><tr><td></td></tr></table>";</script></head>
+<body><div id="content"><h1>Major League Players Born on This Day</h1>
+<table class="sortable stats_table" id="birthdays"><caption>Birthdays</caption>
+<thead><tr>{header}</tr></thead>
+<tbody>
+{chr(10).join(rows)}
+</tbody></table>
+<!--
+<table id="birthdays_extra"><tr><td>hidden</td></tr></table>
+-->
+</div>
+<div id="footer"><table><tr><td>Site index</td></tr></table></div></body></html>
+"""
+
+if __name__ == "__main__":
+    days = [(int(sys.argv[i]), int(sys.argv[i + 1])) for i in range(1, len(sys.argv) - 1, 2)] or DEFAULT_DAYS
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    for month, day in days:
+        with open(os.path.join(FIXTURE_DIR, f"birthdays_{str(month).zfill(2)}_{str(day).zfill(2)}.html"), "w", encoding="utf-8") as f:
+            f.write(birthdays_page(month, day))
@@ -0,0 +1 @@
+# Data model, loaders, and aggregations for the baseball birthdays app
@@ -0,0 +1,185 @@
+import numpy as np
+import pandas as pd
+
+from birthdays.franchises import write_franchise_counts
+from birthdays.schema import display_names
+from birthdays.similar import write_similar_players
+
+# Columns whose daily totals and averages are plain sums over the day's players
+SUMMED_STATS = ["WAR", "ASG", "G_bat", "G_pit", "AB", "H", "HR", "RBI", "SB", "BB", "IP", "W", "L", "SV", "SO"]
+
+# Number of contributors stored per day for each statistic
+TOP_N = 5
+
+# Converts innings pitched from a whole number of outs (196) to standard baseball notation (65.1)
+# @param outs - array of outs pitched
+# return - array of innings pitched in baseball notation
+def outs_to_notation(outs):
+    outs = np.asarray(outs, dtype=np.int64)
+    return outs // 3 + outs % 3 / 10
+
+# Averages weighted by something other than the number of players, as (numerator, denominator) columns of the daily sums:
+# BA by AB, OBP and OPS by estimated PA (AB + BB), SLG by AB, and ERA, ERA+, and WHIP by outs pitched
+AVERAGE_WEIGHTS = {
+    "BA": ("H", "AB"), "OBP": ("OBP_w", "PA_est"), "SLG": ("SLG_w", "AB"), "OPS": ("OPS_w", "PA_est"),
+    "ERA": ("ERA_w", "IP"), "ERA+": ("ERA+_w", "IP"), "WHIP": ("WHIP_w", "IP"),
+}
+
+# The columns the totals and averages are built from, one row per player, so summing any group of rows keeps the weighted averages correct
+# @param players - dataframe of all players in the compact schema
+# return - dataframe of the summed stats, Number of Players, Hall of Famers, PA_est, and the weighted numerators
+def player_sums(players):
+    # The compact int16 and float32 columns are widened so the weighted sums neither overflow nor lose precision
+    # IP stays in outs, which float64 sums exactly
+    stats = players[SUMMED_STATS + ["BA", "OBP", "SLG", "OPS", "ERA", "ERA+", "WHIP"]].astype("float64")
+    est_pa = stats["AB"] + stats["BB"]
+
+    sums = pd.DataFrame({
+        "Number of Players": 1,
+        "Hall of Famers": players["HOF"].astype("int64"),
+        "PA_est": est_pa,
+        "OBP_w": est_pa * stats["OBP"],
+        "SLG_w": stats["AB"] * stats["SLG"],
+        "OPS_w": est_pa * stats["OPS"],
+        "ERA_w": stats["IP"] * stats["ERA"],
+        "ERA+_w": stats["IP"] * stats["ERA+"],
+        "WHIP_w": stats["IP"] * stats["WHIP"],
+    }, index=players.index)
+    sums[SUMMED_STATS] = stats[SUMMED_STATS]
+    return sums.astype("float64")
+
+# Sums every column the totals and averages are built from, for each day, in a single groupby over the combined player table
+# Any range of days can be aggregated by adding these rows up
+# @param players - dataframe of all players in the compact schema
+# return - dataframe with one row per day of the year of the player_sums columns
+def daily_sums(players):
+    sums = player_sums(players).groupby(players["day_of_year"]).sum().reindex(range(366), fill_value=0)
+    sums.index.name = "day_of_year"
+    return sums
+
+# Sums the same columns as daily_sums for each day, birth year, and filterable group of players, keeping only the combinations that have players
+# Hall of Famers and pitchers (anyone with a game pitched) are kept apart so either can be filtered out without the player table
+# @param players - dataframe of all players in the compact schema
+# return - long dataframe with day_of_year, Born, HOF, and pitcher columns followed by the player_sums columns
+def day_year_sums(players):
+    keys = [players["day_of_year"], players["Born"], players["HOF"], (players["G_pit"] > 0).rename("pitcher")]
+    return player_sums(players).groupby(keys).sum().reset_index()
+
+# Turns summed columns into a total or an average
+# @param sums - dataframe of summed columns (one value per row), or a series of them for a single range of days
+# @param stat - column name of the statistic
+# @param is_avg - boolean value representing whether to return the total (False) or the average (True)
+# return - array with one value per row of sums, or a single value for a series; averages with nothing to average over are NaN
+def stat_from_sums(sums, stat, is_avg):
+    if not is_avg:
+        total = np.asarray(sums[stat], dtype=float)
+        # IP is summed in outs and shown in standard baseball notation
+        return outs_to_notation(total) if stat == "IP" else total
+
+    numerator, denominator = AVERAGE_WEIGHTS.get(stat, (stat, "Number of Players"))
+    numerator = np.asarray(sums[numerator], dtype=float)
+    denominator = np.asarray(sums[denominator], dtype=float)
+    average = np.divide(numerator, denominator, out=np.full(numerator.shape, np.nan), where=denominator != 0)
+    # The average IP is in innings, with its fraction left as a decimal
+    return average / 3 if stat == "IP" else average
+
+# Computes every daily total and average from the daily sums
+# @param players - dataframe of all players in the compact schema
+# return - a tuple of two dictionaries (totals, averages), each mapping a column name to an array with one value per day of the year
+def aggregate_stats(players):
+    sums = daily_sums(players)
+    totals = {stat: stat_from_sums(sums, stat, False) for stat in SUMMED_STATS + ["Number of Players", "Hall of Famers"]}
+    avgs = {stat: stat_from_sums(sums, stat, True) for stat in SUMMED_STATS + list(AVERAGE_WEIGHTS)}
+    return totals, avgs
+
+# Counts the players on each day with more than the given career WAR
+# Depends on a user-chosen minimum, so it is the one aggregate computed at request time
+# @param players - dataframe of all players with a day_of_year column
+# @param war_min - float representing the minimum WAR
+# return - array with the number of qualifying players for each day of the year
+def count_players_over_war(players, war_min):
+    return np.bincount(players.loc[players["WAR"] > war_min, "day_of_year"], minlength=366)
+
+# Finds each day's leading players for every summed statistic, plus each day's Hall of Famers
+# Ties keep the order of the source table
+# @param players - dataframe of all players in the compact schema
+# @param n - number of players to keep per day for each statistic
+# return - a long dataframe with stat, day_of_year, rank, Name, HOF, and value columns
+def top_contributors(players, n=TOP_N):
+    day = players["day_of_year"].to_numpy()
+    names = players["Name"].astype(str).to_numpy()
+    hof = players["HOF"].to_numpy()
+    frames = []
+
+    for stat in SUMMED_STATS:
+        values = players[stat].to_numpy()
+        order = np.lexsort((-values, day))
+        ranked = pd.DataFrame({"day_of_year": day[order], "Name": names[order], "HOF": hof[order], "value": values[order].astype(float)})
+        ranked["rank"] = ranked.groupby("day_of_year").cumcount()
+        frames.append(ranked[ranked["rank"] < n].assign(stat=stat))
+
+    # Every Hall of Famer is kept so the full list can be shown
+    hofers = players[players["HOF"]]
+    frames.append(pd.DataFrame({
+        "stat": "Hall of Famers",
+        "day_of_year": hofers["day_of_year"].to_numpy(),
+        "rank": hofers.groupby("day_of_year").cumcount().to_numpy(),
+        "Name": hofers["Name"].astype(str).to_numpy(),
+        "HOF": True,
+        "value": 1.0,
+    }))
+
+    return pd.concat(frames, ignore_index=True)[["stat", "day_of_year", "rank", "Name", "HOF", "value"]]
+
+# Precomputes the stat x day cube, the daily sums behind it, the sums by day and birth year, the per-day contributor lists, and the franchise x day counts
+# and writes them next to the raw data
+# @param players - dataframe of all players with a day_of_year column
+# @param directory - folder to write daily_stats.parquet, daily_sums.parquet, day_year_sums.parquet, top_contributors.parquet, and franchise_counts.parquet to
+def write_cube(players, directory="Data"):
+    totals, avgs = aggregate_stats(players)
+
+    daily_stats = pd.DataFrame({f"{stat}_total": values for stat, values in totals.items()})
+    for stat, values in avgs.items():
+        daily_stats[f"{stat}_avg"] = values
+    daily_stats.index.name = "day_of_year"
+
+    daily_stats.to_parquet(f"{directory}/daily_stats.parquet")
+    daily_sums(players).to_parquet(f"{directory}/daily_sums.parquet")
+    day_year_sums(players).to_parquet(f"{directory}/day_year_sums.parquet", index=False)
+    top_contributors(players).to_parquet(f"{directory}/top_contributors.parquet", index=False)
+    write_franchise_counts(players, directory)
+    write_similar_players(players, directory)
+
+# Reads the precomputed cube written by write_cube
+# @param directory - folder containing daily_stats.parquet and top_contributors.parquet
+# return - a tuple (totals, averages, contributors): two dictionaries of daily arrays, and the contributors indexed by stat and day_of_year
+def load_cube(directory="Data"):
+    daily_stats = pd.read_parquet(f"{directory}/daily_stats.parquet")
+
+    totals = {}
+    avgs = {}
+    for column in daily_stats.columns:
+        stat, kind = column.rsplit("_", 1)
+        if kind == "total":
+            totals[stat] = daily_stats[column].to_numpy()
+        else:
+            avgs[stat] = daily_stats[column].to_numpy()
+
+    contributors = pd.read_parquet(f"{directory}/top_contributors.parquet")
+    contributors = contributors.sort_values(["stat", "day_of_year", "rank"]).set_index(["stat", "day_of_year"])
+
+    return totals, avgs, contributors
+
+# Returns the leading players for one statistic on one day
+# @param contributors - contributors dataframe from load_cube
+# @param stat - column name of the statistic
+# @param day_of_year - int representing a number of days into the year
+# @param n - maximum number of players to return
+# return - list of (name, value) tuples, best first, with " HOF" after Hall of Famers' names except in the Hall of Famers list itself
+def daily_contributors(contributors, stat, day_of_year, n=3):
+    key = (stat, day_of_year)
+    if key not in contributors.index:
+        return []
+    day = contributors.loc[key].iloc[:n]
+    names = day["Name"] if stat == "Hall of Famers" else display_names(day)
+    return list(zip(names, day["value"]))
@@ -0,0 +1,24 @@
+import io
+
+from birthdays.days import MONTH_NAMES, MONTH_STARTS
+
+# Draws a graph of one value per birthday and returns it as a PNG
+# matplotlib is imported on the first graph rather than with the package, and the figure is created without pyplot,
+# so no global figure is left open and it is freed once the PNG is saved
+# @param values - array with one value per day of the year
+# @param label - y-axis label, also used in the title, e.g. "Total Pitching Wins"
+# return - bytes of the PNG image
+def daily_chart_png(values, label):
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(10, 3))
+    ax = fig.subplots()
+    ax.set_xticks(MONTH_STARTS, labels=[name[:3] for name in MONTH_NAMES])
+    ax.set_xlabel("Birthday")
+    ax.set_ylabel(label)
+    ax.set_title(f"{label} For Each Birthday")
+    ax.plot(values)
+
+    png = io.BytesIO()
+    fig.savefig(png, format="png", dpi=200, bbox_inches="tight")
+    return png.getvalue()
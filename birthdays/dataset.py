@@ -0,0 +1,424 @@
+import datetime
+import functools
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from birthdays.aggregates import count_players_over_war, daily_contributors, load_cube, outs_to_notation, stat_from_sums
+from birthdays.days import MONTH_LENGTHS, month_and_day
+from birthdays.eras import EraSums
+from birthdays.franchises import grid_counts, load_franchise_counts
+from birthdays.history import SnapshotHistory
+from birthdays.mapped import ERA_FILTERS, era_sums_name, load_arrays, load_players, mapped_path, write_mapped
+from birthdays.nearest import BirthdateIndex
+from birthdays.ranges import PrefixSums, rolling_sum
+from birthdays.schema import display_names
+from birthdays.search import NameIndex
+from birthdays.similar import SimilarityIndex, load_similar_players
+from birthdays.timing import current, section_run
+from birthdays.versions import DATA_FILES, data_version, day_hashes, file_hash, read_data_version, version_stamp
+
+# Rate stats stored as float32, shown rounded to their stored precision
+RATE_STATS = ["BA", "OBP", "SLG", "OPS", "ERA", "ERA+", "WHIP"]
+
+# The data files each cached table or index is built from, so one built from files that did not change can be kept across a reload
+BUILT_FROM = {
+    "cube": ["daily_stats.parquet", "top_contributors.parquet"],
+    "prefix_sums": ["daily_sums.parquet"],
+    "day_year_sums": ["day_year_sums.parquet"],
+    "era_prefix_sums": ["day_year_sums.parquet", "birthdays.parquet"],
+    "franchise_counts": ["franchise_counts.parquet"],
+    "birth_years": ["birthdays.parquet"],
+    "birthdate_index": ["birthdays.parquet"],
+    "name_index": ["birthdays.parquet"],
+    "similarity_index": ["birthdays.parquet"],
+    "similar_lists": ["similar_players.parquet"],
+}
+
+# The indexes a mapped BirthdayData loads from its copy, see write_mapped
+MAPPED_INDEXES = ["prefix_sums", "birthdate_index", "name_index", "similarity_index"]
+
+# The data files each part of a mapped copy is built from, so a part whose files did not change is linked from the previous copy
+MAPPED_FROM = {
+    "players.arrow": ["birthdays.parquet"],
+    **{name: BUILT_FROM[name] for name in MAPPED_INDEXES},
+    **{era_sums_name(hof_only, pitchers_only): BUILT_FROM["era_prefix_sums"] for hof_only, pitchers_only in ERA_FILTERS},
+}
+
+# Everything the app queries, read from the files data_extraction.py writes to Data/
+# Only the player table is read up front; the per-day tables, aggregates, franchise counts, birth-year sums, and birthdate and name indexes
+# are built on first use
+# Nothing is modified once built, so one instance can be shared by every session, request, or batch job
+class BirthdayData:
+
+    # @param directory - folder containing birthdays.parquet and the precomputed aggregate files
+    # @param previous - an earlier BirthdayData for the same folder; whatever it built from files that have not changed since is kept
+    #                   rather than built again, as are its tables of days whose players have not changed, and anything else it
+    #                   had built is built up front, so queries are as fast right after a reload as before it
+    # @param mapped - True to memory-map the player table, prefix sums, and indexes from the copy in Data/mapped/ rather than
+    #                 reading and building them, writing the copy first if this host has none for this data; every process
+    #                 mapping it shares one copy in memory
+    def __init__(self, directory="Data", previous=None, mapped=False):
+        self.directory = directory
+        # Read before the data files, so it never describes newer data than was read
+        self.data_version = read_data_version(directory)
+        # Folder of the memory-mapped copy, or None when not mapped
+        self.mapped = mapped_copy(self, previous) if mapped else None
+        # EraSums for each combination of the Hall of Famers only and pitchers only filters, see era_sums
+        self.era_prefix_sums = {}
+
+        if previous is not None and previous.file_hashes["birthdays.parquet"] == self.file_hashes["birthdays.parquet"]:
+            self.players = previous.players
+        elif self.mapped:
+            self.players = load_players(self.mapped)
+        else:
+            self.players = pd.read_parquet(f"{directory}/birthdays.parquet")
+
+        # Number of days whose players changed since previous, None without one
+        self.changed_days = None
+        if previous is not None:
+            self.changed_days = self.keep_unchanged(previous)
+            for name in BUILT_FROM:
+                if name in previous.__dict__:
+                    getattr(self, name)
+            for hof_only, pitchers_only in previous.era_prefix_sums:
+                self.era_sums(hof_only, pitchers_only)
+
+        # Every file of the mapped copy is mapped now, which reads none of it yet, so the arrays stay readable after
+        # write_mapped removes the copy once newer data has been mapped
+        if self.mapped:
+            for name in MAPPED_INDEXES:
+                getattr(self, name)
+            for hof_only, pitchers_only in ERA_FILTERS:
+                self.era_sums(hof_only, pitchers_only)
+
+    # Takes over what an earlier BirthdayData built from files that have not changed
+    # return - number of days whose players changed
+    def keep_unchanged(self, previous):
+        for name, files in BUILT_FROM.items():
+            if name in previous.__dict__ and all(previous.file_hashes[f] == self.file_hashes[f] for f in files):
+                self.__dict__[name] = previous.__dict__[name]
+
+        if self.players is previous.players:
+            if "day_tables" in previous.__dict__:
+                self.day_tables = previous.day_tables
+            return 0
+
+        kept = [old == new for old, new in zip(previous.day_hashes, self.day_hashes)]
+        if "day_tables" in previous.__dict__:
+            self.day_tables = self.build_day_tables(previous.day_tables, kept)
+        return kept.count(False)
+
+    # One dataframe per day without the month, day, and day_of_year columns, indexed as [month - 1][day - 1]
+    @functools.cached_property
+    def day_tables(self):
+        return self.build_day_tables()
+
+    # @param previous_tables - day_tables of an earlier BirthdayData to take unchanged days from, or None
+    # @param kept - list of 366 booleans, True for each day_of_year whose table is taken from previous_tables
+    # return - the tables of every day, indexed as [month - 1][day - 1]
+    def build_day_tables(self, previous_tables=None, kept=None):
+        day_rows = self.players.groupby("day_of_year").indices
+        # Without copying any data
+        day_columns = self.players.drop(columns=["month", "day", "day_of_year"])
+
+        tables = [[] for _ in range(12)]
+        day_of_year = 0
+        for i in range(12):
+            for j in range(MONTH_LENGTHS[i]):
+                rows = day_rows.get(day_of_year, [])
+                if kept is not None and kept[day_of_year]:
+                    tables[i].append(previous_tables[i][j])
+                elif len(rows) and rows[-1] - rows[0] + 1 == len(rows):
+                    # The player table is stored in day order, so a day's rows are a slice, which shares the table's memory
+                    tables[i].append(day_columns.iloc[rows[0]:rows[-1] + 1].reset_index(drop=True))
+                else:
+                    tables[i].append(day_columns.iloc[rows].reset_index(drop=True))
+                day_of_year += 1
+
+        return tables
+
+    # Tuple (totals, averages, contributors) from load_cube
+    @functools.cached_property
+    def cube(self):
+        return load_cube(self.directory)
+
+    # Cumulative daily sums for range and rolling-window aggregates
+    @functools.cached_property
+    def prefix_sums(self):
+        if self.mapped:
+            return load_arrays(PrefixSums, f"{self.mapped}/prefix_sums")
+        return PrefixSums(pd.read_parquet(f"{self.directory}/daily_sums.parquet"))
+
+    # Sums by day, birth year, and filterable group from day_year_sums
+    @functools.cached_property
+    def day_year_sums(self):
+        return pd.read_parquet(f"{self.directory}/day_year_sums.parquet")
+
+    # Tuple of the earliest and latest birth years in the data
+    @functools.cached_property
+    def birth_years(self):
+        return int(self.players["Born"].min()), int(self.players["Born"].max())
+
+    @functools.cached_property
+    def franchise_counts(self):
+        return load_franchise_counts(self.directory)
+
+    @functools.cached_property
+    def birthdate_index(self):
+        if self.mapped:
+            return load_arrays(BirthdateIndex, f"{self.mapped}/birthdate_index")
+        return BirthdateIndex(self.players)
+
+    @functools.cached_property
+    def name_index(self):
+        if self.mapped:
+            return load_arrays(NameIndex, f"{self.mapped}/name_index")
+        return NameIndex(self.players)
+
+    @functools.cached_property
+    def similarity_index(self):
+        if self.mapped:
+            return load_arrays(SimilarityIndex, f"{self.mapped}/similarity_index")
+        return SimilarityIndex(self.players)
+
+    # The most similar players to every player, precomputed by data_extraction.py, see load_similar_players
+    @functools.cached_property
+    def similar_lists(self):
+        return load_similar_players(self.directory)
+
+    # Past versions of the player table from the history files data_extraction.py appends to
+    @functools.cached_property
+    def history(self):
+        return SnapshotHistory(self.directory)
+
+    # The hash of each data file, from the version file data_extraction.py writes, or hashed here for data without one
+    @functools.cached_property
+    def file_hashes(self):
+        if self.data_version is not None:
+            return self.data_version["files"]
+        return {name: file_hash(f"{self.directory}/{name}") for name in DATA_FILES}
+
+    # The hash of each day's players, by day_of_year
+    @functools.cached_property
+    def day_hashes(self):
+        if self.data_version is not None:
+            return self.data_version["days"]
+        return day_hashes(self.players)
+
+    # Short hash of the data files' contents, which changes whenever data_extraction.py writes different data
+    @functools.cached_property
+    def version(self):
+        return data_version(self.file_hashes)
+
+    # Cumulative sums by day and birth year over Hall of Famers only, pitchers only, both, or neither, built the first time each is asked for
+    # @param hof_only - True to include only Hall of Famers
+    # @param pitchers_only - True to include only players with a game pitched
+    # return - EraSums
+    def era_sums(self, hof_only=False, pitchers_only=False):
+        key = (hof_only, pitchers_only)
+        if key not in self.era_prefix_sums and self.mapped:
+            self.era_prefix_sums[key] = load_arrays(EraSums, f"{self.mapped}/{era_sums_name(hof_only, pitchers_only)}")
+        elif key not in self.era_prefix_sums:
+            sums = self.day_year_sums
+            if hof_only:
+                sums = sums[sums["HOF"]]
+            if pitchers_only:
+                sums = sums[sums["pitcher"]]
+            self.era_prefix_sums[key] = EraSums(sums, *self.birth_years)
+        return self.era_prefix_sums[key]
+
+    # @param players_filter - PlayerFilter, or None for every player
+    # return - the filter, or None when it keeps every player
+    def narrowing(self, players_filter):
+        if players_filter is None or players_filter.hof_only or players_filter.pitchers_only:
+            return players_filter
+        first_year, last_year = self.birth_years
+        if (players_filter.first_year or first_year) <= first_year and (players_filter.last_year or last_year) >= last_year:
+            return None
+        return players_filter
+
+    # @param month - a number representing the month
+    # @param day - a number representing the day of the month
+    # return - dataframe of the players born on that day
+    def day_table(self, month, day):
+        return self.day_tables[month - 1][day - 1]
+
+    # The players born on a day as the site shows them, without altering the underlying data:
+    # " HOF" after Hall of Famers' names, rate stats at their stored precision, and IP in standard baseball notation (1/3 of an inning as .1)
+    def display_table(self, month, day):
+        table = self.day_table(month, day)
+        shown = table.drop(columns="HOF").astype({stat: "float64" for stat in RATE_STATS}).round(3)
+        shown["Name"] = display_names(table)
+        shown["IP"] = outs_to_notation(table["IP"])
+        return shown
+
+    # Looks up each day's total or average of a statistic, optionally smoothed over a rolling window of days
+    # Smoothed totals are the window's average daily total; smoothed averages are weighted over every player in the window
+    # @param stat_name - string representing name of statistic
+    # @param is_avg - boolean value representing whether to return totals (False) or averages (True)
+    # @param war_min - float representing the minimum WAR for the "Players Over _ WAR" count, unused for any other statistic
+    # @param window - number of days in the rolling window centered on each day, 1 for no smoothing
+    # @param players_filter - PlayerFilter of the players to include, or None for every player
+    # return - array with one value per day of the year
+    def daily_values(self, stat_name, is_avg, war_min=0, window=1, players_filter=None):
+        players_filter = self.narrowing(players_filter)
+
+        if not is_avg and stat_name == "Players Over _ WAR":
+            players = self.players if players_filter is None else self.players[players_filter.mask(self.players)]
+            counts = count_players_over_war(players, war_min)
+            return counts if window == 1 else rolling_sum(counts, window) / window
+
+        if players_filter is not None:
+            daily = self.era_sums(players_filter.hof_only, players_filter.pitchers_only).daily_sums(players_filter.first_year, players_filter.last_year)
+            if window > 1:
+                daily = PrefixSums(daily).rolling_sums(window) / window
+            return stat_from_sums(daily, stat_name, is_avg)
+
+        if window == 1:
+            totals, avgs, _ = self.cube
+            return avgs[stat_name] if is_avg else totals[stat_name]
+
+        # Scaling every sum by the window length leaves the averages' ratios unchanged
+        return stat_from_sums(self.prefix_sums.rolling_sums(window) / window, stat_name, is_avg)
+
+    # The total or average of a statistic over every player born in a range of days
+    # @param stat_name - string representing name of statistic
+    # @param is_avg - boolean value representing whether to return the total (False) or the average (True)
+    # @param start_day - first day_of_year in the range
+    # @param end_day - last day_of_year in the range, included; a range ending before it starts wraps around the end of the year
+    # @param war_min - float representing the minimum WAR for the "Players Over _ WAR" count, unused for any other statistic
+    # @param players_filter - PlayerFilter of the players to include, or None for every player
+    # return - float, NaN for an average with nothing to average over
+    def range_value(self, stat_name, is_avg, start_day, end_day, war_min=0, players_filter=None):
+        players_filter = self.narrowing(players_filter)
+
+        if not is_avg and stat_name == "Players Over _ WAR":
+            counts = PrefixSums(pd.DataFrame({stat_name: self.daily_values(stat_name, False, war_min, players_filter=players_filter)}))
+            return float(counts.range_sums(start_day, end_day)[stat_name])
+
+        if players_filter is not None:
+            sums = self.era_sums(players_filter.hof_only, players_filter.pitchers_only).range_sums(start_day, end_day, players_filter.first_year, players_filter.last_year)
+        else:
+            sums = self.prefix_sums.range_sums(start_day, end_day)
+        return float(stat_from_sums(sums, stat_name, is_avg))
+
+    # Lists a day's leading players for a statistic, or all of the day's Hall of Famers
+    # @param stat_name - string representing name of statistic
+    # @param day_of_year - int representing a number of days into the year
+    # @param players_filter - PlayerFilter of the players to list from, or None for every player
+    # return - a string of names with their values, e.g. "Hank Aaron HOF (143.1), ..."
+    def contributors_caption(self, stat_name, day_of_year, players_filter=None):
+        players_filter = self.narrowing(players_filter)
+
+        if players_filter is None:
+            _, _, contributors = self.cube
+            if stat_name == "Hall of Famers":
+                return ", ".join(name for name, _ in daily_contributors(contributors, stat_name, day_of_year, n=None))
+            top_daily = daily_contributors(contributors, stat_name, day_of_year)
+        else:
+            # The stored lists cover every player, so a filtered day's leaders come from its own table, with ties kept in table order
+            table = self.day_table(*month_and_day(day_of_year))
+            table = table[players_filter.mask(table)]
+            if stat_name == "Hall of Famers":
+                return ", ".join(table.loc[table["HOF"], "Name"].astype(str))
+            leaders = table.nlargest(3, stat_name, keep="first")
+            top_daily = list(zip(display_names(leaders), leaders[stat_name].astype(float)))
+
+        values = [value for _, value in top_daily]
+        if stat_name == "IP":
+            values = outs_to_notation(values)
+
+        # WAR is the only contributor stat with a decimal part, and it always has one
+        value_format = ".1f" if stat_name == "WAR" else "g"
+        return ", ".join(f"{name} ({value:{value_format}})" for (name, _), value in zip(top_daily, values))
+
+    # Returns the players born closest to a date
+    # @param date - datetime.date value representing the target day
+    # @param k - number of players to return
+    # return - a list of lists, with each sublist representing a player and containing name, WAR, and birthdate
+    def closest_players(self, date, k=5):
+        return self.player_birthdates(self.birthdate_index.nearest(date, k))
+
+    # Finds players by name, across every birthday
+    # @param query - the start of a player's name or of any later word of it, in any case and with or without accents
+    # @param k - maximum number of players to return
+    # return - a list of lists like closest_players, best match first; the birthdate leads to the player's day
+    def search_players(self, query, k=10):
+        return self.player_birthdates(self.name_index.search(query, k))
+
+    # Finds the players whose careers are most like a player's, over the columns of SIMILARITY_COLUMNS
+    # Read from the precomputed lists when they are long enough, and searched for otherwise
+    # @param month - a number representing the month the player was born in
+    # @param day - a number representing the day of the month
+    # @param position - the player's place in that day's table
+    # @param k - number of players to return
+    # return - a list of lists like closest_players, most similar first
+    def similar_players(self, month, day, position, k=5):
+        row = int(np.flatnonzero((self.players["month"].to_numpy() == month) & (self.players["day"].to_numpy() == day))[position])
+        if k <= self.similar_lists.shape[1]:
+            return self.player_birthdates(self.similar_lists[row, :k])
+        return self.player_birthdates(self.similarity_index.similar(row, k)[0])
+
+    # @param rows - row positions in the player table
+    # return - a list of lists, with each sublist representing a player and containing name, WAR, and birthdate
+    def player_birthdates(self, rows):
+        players = self.players.iloc[rows]
+        return [[name, war, datetime.date(year, month, day)] for name, war, year, month, day in zip(display_names(players), players["WAR"], players["Born"], players["month"], players["day"])]
+
+    # Player counts for the franchises in the logo grid on one day, see grid_counts
+    def franchise_grid(self, day_of_year):
+        return grid_counts(self.franchise_counts, day_of_year)
+
+# Finds the memory-mapped copy of a dataset's data version, writing it from the data files if this host has none yet
+# Only the parts built from changed files are built; the rest are linked from the previous dataset's copy
+# @param dataset - BirthdayData whose version to map
+# @param previous - the BirthdayData loaded before it, or None
+# return - folder of the mapped copy, or None when it cannot be written (e.g. a read-only data folder), to read the data files instead
+def mapped_copy(dataset, previous=None):
+    path = mapped_path(dataset.directory, dataset.version)
+    if not os.path.isdir(path):
+        unchanged = []
+        if previous is not None and previous.mapped:
+            unchanged = [part for part, files in MAPPED_FROM.items() if all(previous.file_hashes[f] == dataset.file_hashes[f] for f in files)]
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            write_mapped(BirthdayData(dataset.directory), path, previous.mapped if previous is not None else None, unchanged)
+        except OSError:
+            return None
+    return path
+
+# The latest BirthdayData for a folder, shared by every session or request
+# Every get() checks the version file's modification time, and when data_extraction.py has written new data, loads it in place of
+# the old, keeping everything built from files and days that did not change
+# When mapped, the new version's copy links the parts built from unchanged files from the old copy, but builds every part that
+# depends on a changed file in full; a scrape that changes any player changes birthdays.parquet, which rebuilds the player table,
+# the search and similarity indexes, and the era sums, so the saving is for pushes that leave the players as they were
+# One caller loads the new data while any others keep getting the old data until it is ready
+class DataStore:
+
+    # @param directory - folder holding the data files
+    # @param mapped - True to memory-map each version of the data, see BirthdayData
+    def __init__(self, directory="Data", mapped=False):
+        self.directory = directory
+        self.mapped = mapped
+        self.lock = threading.Lock()
+        self.stamp = version_stamp(directory)
+        self.dataset = BirthdayData(directory, mapped=mapped)
+
+    # return - the BirthdayData of the newest data
+    def get(self):
+        stamp = version_stamp(self.directory)
+        if stamp != self.stamp and self.lock.acquire(blocking=False):
+            try:
+                # Another caller may have finished loading it between the check and taking the lock
+                if stamp != self.stamp:
+                    with section_run("reload_data", "data reload"):
+                        dataset = BirthdayData(self.directory, previous=self.dataset, mapped=self.mapped)
+                        current().count("days_changed", dataset.changed_days)
+                    self.dataset, self.stamp = dataset, stamp
+            finally:
+                self.lock.release()
+        return self.dataset
@@ -0,0 +1,22 @@
+import numpy as np
+
+# Days are numbered 0 to 365 on a leap year calendar, so February 29 always has its own day_of_year
+MONTH_LENGTHS = [31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
+MONTH_NAMES = ["January", "February", "March", "April", "May", "June", "July", "August", "September", "October", "November", "December"]
+
+# day_of_year of the first day of each month
+MONTH_STARTS = np.concatenate([[0], np.cumsum(MONTH_LENGTHS)[:-1]])
+
+# Takes a month and day and translates them into the 0-indexed day of the year used by the aggregates
+# @param month - a number representing the month, 1 for January
+# @param day - a number representing the day of the month
+# return - int representing a number of days into the year
+def day_of_year(month, day):
+    return int(MONTH_STARTS[month - 1]) + day - 1
+
+# Takes an int representing the day of the year and translates it into the month and day
+# @param day_of_year - int representing a number of days into the year
+# return - a tuple containing the month (1 for January) and the day of the month
+def month_and_day(day_of_year):
+    month = int(np.searchsorted(MONTH_STARTS, day_of_year, side="right"))
+    return month, day_of_year - int(MONTH_STARTS[month - 1]) + 1
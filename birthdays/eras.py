@@ -0,0 +1,83 @@
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+# Which players the group statistics cover: a range of birth years (None for no bound), and optionally only Hall of Famers or only pitchers
+# Hashable, so it can be part of a cache key
+class PlayerFilter(namedtuple("PlayerFilter", ["first_year", "last_year", "hof_only", "pitchers_only"], defaults=[None, None, False, False])):
+
+    # @param players - dataframe of players with Born, HOF, and G_pit columns
+    # return - boolean array of the players the filter keeps
+    def mask(self, players):
+        keep = np.ones(len(players), dtype=bool)
+        if self.first_year is not None:
+            keep &= players["Born"].to_numpy() >= self.first_year
+        if self.last_year is not None:
+            keep &= players["Born"].to_numpy() <= self.last_year
+        if self.hof_only:
+            keep &= players["HOF"].to_numpy()
+        if self.pitchers_only:
+            keep &= players["G_pit"].to_numpy() > 0
+        return keep
+
+    # return - the filtered players for a graph title, e.g. "Hall of Fame Pitchers Born 1900-1950", or "" for no filter
+    def describe(self):
+        group = ("Hall of Fame " if self.hof_only else "") + ("Pitchers" if self.pitchers_only else "Players" if self.hof_only else "")
+        if self.first_year is None and self.last_year is None:
+            return group
+        if self.last_year is None:
+            years = f"Born {self.first_year} or Later"
+        elif self.first_year is None:
+            years = f"Born {self.last_year} or Earlier"
+        else:
+            years = f"Born {self.first_year}-{self.last_year}"
+        return f"{group} {years}" if group else years
+
+# Cumulative sums over both the day of the year and the birth year of the columns from day_year_sums,
+# so the sums over any range of days and birth years are found in O(1)
+class EraSums:
+
+    # @param sums - long dataframe from day_year_sums, already narrowed to the players to include
+    # @param first_year - earliest birth year in the data
+    # @param last_year - latest birth year in the data
+    def __init__(self, sums, first_year, last_year):
+        self.columns = sums.columns.drop(["day_of_year", "Born", "HOF", "pitcher"])
+        self.first_year = first_year
+        self.last_year = last_year
+
+        cells = np.zeros((366, last_year - first_year + 1, len(self.columns)))
+        # Hall of Famers and pitchers share a day and birth year with other players, so rows are added rather than assigned
+        np.add.at(cells, (sums["day_of_year"].to_numpy(), sums["Born"].to_numpy() - first_year), sums[self.columns].to_numpy(dtype=float))
+
+        # prefix[d, y] is the sum over days before d and birth years before first_year + y
+        self.prefix = np.zeros((367, cells.shape[1] + 1, len(self.columns)))
+        self.prefix[1:, 1:] = cells.cumsum(axis=0).cumsum(axis=1)
+
+    # @param first_year - first birth year to include, or None for the earliest
+    # @param last_year - last birth year to include, or None for the latest
+    # return - the prefix array's birth-year indices bounding the range
+    def year_bounds(self, first_year, last_year):
+        first_year = self.first_year if first_year is None else min(max(first_year, self.first_year), self.last_year + 1)
+        last_year = self.last_year if last_year is None else min(max(last_year, self.first_year - 1), self.last_year)
+        return first_year - self.first_year, max(last_year - self.first_year + 1, first_year - self.first_year)
+
+    # Sums every column for each day of the year over a range of birth years
+    # return - dataframe with one row per day of the year, like daily_sums
+    def daily_sums(self, first_year=None, last_year=None):
+        low, high = self.year_bounds(first_year, last_year)
+        years = self.prefix[:, high] - self.prefix[:, low]
+        return pd.DataFrame(years[1:] - years[:-1], columns=self.columns)
+
+    # Sums every column over a range of days and a range of birth years
+    # @param start_day - first day_of_year in the range
+    # @param end_day - last day_of_year in the range, included; a range ending before it starts wraps around the end of the year
+    # return - series with the range's sum of each column
+    def range_sums(self, start_day, end_day, first_year=None, last_year=None):
+        low, high = self.year_bounds(first_year, last_year)
+        days = self.prefix[:, high] - self.prefix[:, low]
+        if start_day <= end_day:
+            total = days[end_day + 1] - days[start_day]
+        else:
+            total = days[-1] - days[start_day] + days[end_day + 1]
+        return pd.Series(total, index=self.columns)
@@ -0,0 +1,42 @@
+import pandas as pd
+
+# The 30 current franchises as they appear in the logo grid, one division per row: (franchise code in the data, logo file)
+FRANCHISE_GRID = [
+    [("BAL", "BAL.png"), ("BOS", "BOS.png"), ("NYY", "NYY.png"), ("TBD", "TB.png"), ("TOR", "TOR.png")],
+    [("CHW", "CHW.png"), ("CLE", "CLE.png"), ("DET", "DET.png"), ("KCR", "KC.png"), ("MIN", "MIN.png")],
+    [("HOU", "HOU.png"), ("ANA", "LAA.png"), ("OAK", "OAK.png"), ("SEA", "SEA.png"), ("TEX", "TEX.png")],
+    [("ATL", "ATL.png"), ("FLA", "MIA.png"), ("NYM", "NYM.png"), ("PHI", "PHI.png"), ("WSN", "WAS.png")],
+    [("CHC", "CHC.png"), ("CIN", "CIN.png"), ("MIL", "MIL.png"), ("PIT", "PIT.png"), ("STL", "STL.png")],
+    [("ARI", "ARI.png"), ("COL", "COL.png"), ("LAD", "LAD.png"), ("SDP", "SD.png"), ("SFG", "SF.png")],
+]
+
+# Counts how many players born on each day played for each franchise
+# Each distinct Franchises string is split once, so the work grows with the number of distinct strings rather than players
+# @param players - dataframe of all players with Franchises and day_of_year columns
+# return - dataframe with one row per day of the year and one column per franchise code
+def franchise_day_counts(players):
+    franchises = players["Franchises"].astype("category")
+
+    # Multi-hot franchise membership of each distinct Franchises string, then of each player
+    membership = pd.Series(franchises.cat.categories).str.get_dummies(sep=",")
+    membership = membership.drop(columns="0", errors="ignore")
+    player_membership = pd.DataFrame(membership.to_numpy()[franchises.cat.codes], columns=membership.columns, index=players.index)
+
+    counts = player_membership.groupby(players["day_of_year"]).sum().reindex(range(366), fill_value=0)
+    counts.index.name = "day_of_year"
+    return counts.astype("int32")
+
+# Writes the franchise x day counts next to the raw data
+def write_franchise_counts(players, directory="Data"):
+    franchise_day_counts(players).to_parquet(f"{directory}/franchise_counts.parquet")
+
+def load_franchise_counts(directory="Data"):
+    return pd.read_parquet(f"{directory}/franchise_counts.parquet")
+
+# Counts for the franchises in the logo grid on one day
+# @param counts - dataframe from franchise_day_counts
+# @param day_of_year - int representing a number of days into the year
+# return - list of rows matching FRANCHISE_GRID, each a list of player counts
+def grid_counts(counts, day_of_year):
+    day = counts.iloc[day_of_year]
+    return [[int(day.get(code, 0)) for code, _ in row] for row in FRANCHISE_GRID]
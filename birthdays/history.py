@@ -0,0 +1,151 @@
+import datetime
+import os
+
+import numpy as np
+import pandas as pd
+
+from birthdays.aggregates import player_sums, stat_from_sums
+from birthdays.schema import PLAYER_DTYPES
+
+# Folder inside the data folder holding one file of changed rows per scrape, never rewritten once written
+HISTORY_DIR = "history"
+
+# Columns identifying a player across runs; occurrence numbers players who would otherwise share a key, in table order
+KEY_COLUMNS = ["month", "day", "Name", "Born", "From", "occurrence"]
+
+# Columns each history file adds to the player table's: when the row was scraped, whether the player was removed from
+# their day rather than changed, and their place in their day's table
+HISTORY_DTYPES = {"run": "datetime64[s, UTC]", "removed": "bool", "occurrence": "int16", "position": "int16"}
+
+# @param directory - folder holding the data files
+# @param run - time of the scrape
+# return - path of the history file of that scrape
+def history_path(directory, run):
+    return f"{directory}/{HISTORY_DIR}/{run:%Y-%m-%dT%H%M%SZ}.parquet"
+
+# @param players - dataframe of players in the compact schema, in table order
+# return - copy with the occurrence and position columns added
+def keyed(players):
+    key = players[KEY_COLUMNS[:-1]].astype({"Name": str})
+    return players.assign(
+        occurrence=key.groupby(KEY_COLUMNS[:-1], sort=False, dropna=False).cumcount().astype("int16"),
+        position=players.groupby("day_of_year", sort=False).cumcount().astype("int16"),
+    )
+
+# Reads every history file in order of the runs that wrote them
+# @param directory - folder holding the data files
+# return - dataframe of every row the files hold, oldest run first, or None if there are none
+def read_deltas(directory="Data"):
+    folder = f"{directory}/{HISTORY_DIR}"
+    files = sorted(name for name in os.listdir(folder) if name.endswith(".parquet")) if os.path.isdir(folder) else []
+    if not files:
+        return None
+
+    # Names are read as strings, since each file's categories differ
+    return pd.concat([pd.read_parquet(f"{folder}/{name}").astype({"Name": str}) for name in files], ignore_index=True)
+
+# Rebuilds the player table from history rows, keeping each player's row from the latest run
+# @param deltas - rows from read_deltas
+# return - dataframe of players in the compact schema and table order
+def replay(deltas):
+    latest = deltas.drop_duplicates(KEY_COLUMNS, keep="last")
+    latest = latest[~latest["removed"].to_numpy()].sort_values(["day_of_year", "position"], kind="stable")
+    return latest[list(PLAYER_DTYPES)].astype(PLAYER_DTYPES).reset_index(drop=True)
+
+# Records a scrape in the history, writing only the rows that differ from the last recorded table: new and changed players,
+# and removed players marked as such
+# A day whose players were added, removed, or reordered has all of its rows written, so every day's order is rebuilt exactly
+# The first run records every row; a run that changed nothing writes no file
+# @param players - dataframe of all players in the compact schema, as written to birthdays.parquet
+# @param run - time of the scrape, timezone-aware
+# @param directory - folder holding the data files
+# return - number of rows written
+def append_history(players, run, directory="Data"):
+    current = keyed(players)
+    deltas = read_deltas(directory)
+    previous = keyed(replay(deltas)) if deltas is not None else current.iloc[:0]
+
+    columns = list(PLAYER_DTYPES) + ["occurrence"]
+    current_hashes = pd.util.hash_pandas_object(current[columns].astype({"Name": str}), index=False).to_numpy()
+    previous_hashes = pd.util.hash_pandas_object(previous[columns].astype({"Name": str}), index=False).to_numpy()
+    current_keys = pd.util.hash_pandas_object(current[KEY_COLUMNS].astype({"Name": str}), index=False).to_numpy()
+    previous_keys = pd.util.hash_pandas_object(previous[KEY_COLUMNS].astype({"Name": str}), index=False).to_numpy()
+
+    # Days whose sequence of players differs
+    # Both tables are in day order, so each day's players are one slice of each
+    current_bounds = np.searchsorted(current["day_of_year"].to_numpy(), np.arange(367))
+    previous_bounds = np.searchsorted(previous["day_of_year"].to_numpy(), np.arange(367))
+    reordered = np.array([
+        not np.array_equal(current_keys[current_bounds[day]:current_bounds[day + 1]], previous_keys[previous_bounds[day]:previous_bounds[day + 1]])
+        for day in range(366)
+    ])
+    changed = ~np.isin(current_hashes, previous_hashes) | reordered[current["day_of_year"].to_numpy()]
+    removed = previous[~np.isin(previous_keys, current_keys)]
+
+    rows = pd.concat([current[changed].assign(removed=False), removed.assign(removed=True)], ignore_index=True)
+    if rows.empty:
+        return 0
+
+    rows = rows.assign(run=run).astype({"Name": "category", "Franchises": "category", **HISTORY_DTYPES})
+    os.makedirs(f"{directory}/{HISTORY_DIR}", exist_ok=True)
+    path = history_path(directory, run)
+    rows.to_parquet(f"{path}.tmp", index=False)
+    os.replace(f"{path}.tmp", path)
+    return len(rows)
+
+# Past versions of the player table, rebuilt from the history files data_extraction.py appends to on every scrape
+class SnapshotHistory:
+
+    # @param directory - folder holding the data files
+    def __init__(self, directory="Data"):
+        self.deltas = read_deltas(directory)
+        if self.deltas is None:
+            self.deltas = keyed(pd.DataFrame({column: pd.Series(dtype=dtype) for column, dtype in PLAYER_DTYPES.items()}))
+            self.deltas = self.deltas.assign(run=pd.Series(dtype=HISTORY_DTYPES["run"]), removed=pd.Series(dtype="bool"))
+        # Time of every recorded scrape, oldest first
+        self.runs = pd.DatetimeIndex(self.deltas["run"].unique())
+
+    # @param as_of - date (through the end of that day, UTC) or datetime
+    # return - the deltas of the runs up to then
+    def deltas_until(self, as_of):
+        if isinstance(as_of, datetime.datetime):
+            until = pd.Timestamp(as_of)
+        else:
+            until = pd.Timestamp(as_of) + pd.Timedelta(days=1) - pd.Timedelta(seconds=1)
+        until = until.tz_localize("UTC") if until.tzinfo is None else until.tz_convert("UTC")
+        return self.deltas[self.deltas["run"] <= until]
+
+    # Rebuilds the player table as the latest scrape up to a time left it
+    # @param as_of - date (through the end of that day, UTC) or datetime, or None for the latest scrape
+    # return - dataframe of players in the compact schema and table order, empty before the first recorded scrape
+    def snapshot(self, as_of=None):
+        return replay(self.deltas if as_of is None else self.deltas_until(as_of))
+
+    # The total or average of a statistic over a range of days after every recorded scrape
+    # Each run's rows are added to a running sum with the rows they replace taken away, so no snapshot is rebuilt
+    # @param stat - column name of the statistic
+    # @param is_avg - boolean value representing whether to return the total (False) or the average (True)
+    # @param start_day - first day_of_year in the range
+    # @param end_day - last day_of_year in the range, included, or None for start_day alone; a range ending before it starts
+    #                  wraps around the end of the year
+    # return - series of values indexed by run time
+    def day_series(self, stat, is_avg, start_day, end_day=None):
+        end_day = start_day if end_day is None else end_day
+        days = self.deltas["day_of_year"].to_numpy()
+        in_range = (days >= start_day) & (days <= end_day) if start_day <= end_day else (days >= start_day) | (days <= end_day)
+        rows = self.deltas[in_range].reset_index(drop=True)
+
+        sums = player_sums(rows)
+        # Missing rate stats count as nothing, as they do in the groupby sums of daily_sums
+        values = sums.fillna(0).to_numpy()
+        values[rows["removed"].to_numpy()] = 0
+        # Each row replaces the row of the same player from the run before it, if any, found by sorting the rows by player
+        players = rows.groupby(KEY_COLUMNS, sort=False, dropna=False).ngroup().to_numpy()
+        order = np.argsort(players, kind="stable")
+        replaces = np.full(len(rows), -1)
+        same_player = players[order[1:]] == players[order[:-1]]
+        replaces[order[1:][same_player]] = order[:-1][same_player]
+        change = values - np.where(replaces[:, None] >= 0, values[replaces], 0)
+
+        totals = pd.DataFrame(change, columns=sums.columns).groupby(rows["run"]).sum().reindex(self.runs, fill_value=0).cumsum()
+        return pd.Series(stat_from_sums(totals, stat, is_avg), index=self.runs, name=stat)
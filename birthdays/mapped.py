@@ -0,0 +1,137 @@
+import json
+import os
+import re
+import shutil
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+# Folder inside the data folder holding one memory-mapped copy of the data per data version
+# Built on each host from the committed files, so it is not committed itself
+MAPPED_DIR = "mapped"
+
+# The (hof_only, pitchers_only) combinations of EraSums kept in a mapped copy
+ERA_FILTERS = [(False, False), (True, False), (False, True), (True, True)]
+
+# @param directory - folder holding the data files
+# @param version - data version, see BirthdayData.version
+# return - folder of the mapped copy of that version
+def mapped_path(directory, version):
+    return f"{directory}/{MAPPED_DIR}/{version}"
+
+# Saves an index's numpy arrays as .npy files, and its other attributes (sizes, years, column names) as JSON, for load_arrays
+# @param index - object whose attributes are numpy arrays, pandas Indexes, or JSON values, e.g. a NameIndex
+# @param path - folder to create and save to
+def save_arrays(index, path):
+    os.makedirs(path)
+    attributes = {}
+    for name, value in vars(index).items():
+        if isinstance(value, np.ndarray):
+            np.save(f"{path}/{name}.npy", value)
+        elif isinstance(value, pd.Index):
+            attributes[name] = {"index": value.tolist()}
+        else:
+            attributes[name] = value
+
+    with open(f"{path}/attributes.json", "w") as f:
+        json.dump(attributes, f)
+
+# Maps an index saved by save_arrays back without reading its arrays into memory; pages are read from the file on first use
+# and shared through the page cache by every process mapping the same file
+# @param cls - class of the saved index
+# @param path - folder it was saved to
+# return - instance of cls whose arrays are read-only memory maps
+def load_arrays(cls, path):
+    index = cls.__new__(cls)
+    with open(f"{path}/attributes.json") as f:
+        for name, value in json.load(f).items():
+            setattr(index, name, pd.Index(value["index"]) if isinstance(value, dict) else value)
+
+    for file in os.listdir(path):
+        if file.endswith(".npy"):
+            setattr(index, file.removesuffix(".npy"), np.load(f"{path}/{file}", mmap_mode="r"))
+    return index
+
+# Maps the player table from the Arrow file write_mapped saves
+# Numeric columns are views of the mapped file; only the bool column and the categories' dictionaries are copied into the process
+# @param path - folder of the mapped copy
+# return - dataframe in the compact schema
+def load_players(path):
+    table = pa.ipc.open_file(pa.memory_map(f"{path}/players.arrow")).read_all()
+    return table.to_pandas(split_blocks=True)
+
+# @param hof_only - True for the Hall of Famers only sums
+# @param pitchers_only - True for the pitchers only sums
+# return - name of the folder of those EraSums in a mapped copy
+def era_sums_name(hof_only, pitchers_only):
+    return f"era_sums_{hof_only:d}{pitchers_only:d}"
+
+# Hard-links a file, or every file of a folder, of an earlier mapped copy into a new one, so both share one file on disk and in memory
+# @param source - file or folder in the earlier copy
+# @param target - where to link it in the new copy
+# return - True if linked, False if it could not be (e.g. the earlier copy was removed meanwhile), leaving nothing at target
+def link_part(source, target):
+    try:
+        if os.path.isdir(source):
+            os.makedirs(target)
+            for file in os.listdir(source):
+                os.link(f"{source}/{file}", f"{target}/{file}")
+        else:
+            os.link(source, target)
+    except OSError:
+        if os.path.isdir(target):
+            shutil.rmtree(target, ignore_errors=True)
+        elif os.path.exists(target):
+            os.remove(target)
+        return False
+    return True
+
+# Writes the memory-mapped copy of a dataset: the player table as an uncompressed Arrow file, and the prefix sums,
+# the search indexes, and the career similarity features as .npy files
+# Parts built from files that did not change since an earlier copy are linked from it rather than built and written again
+# It is written to a temporary folder and renamed into place, so processes starting at the same time never see half of it;
+# if another process got there first, its copy is kept
+# Copies of versions before the one replaced are removed. BirthdayData maps every file of its copy when it is created, and a mapped
+# file stays readable until it is unmapped, so processes still using a removed copy do not notice; the copy of the version just
+# replaced is kept for processes that found it but have not mapped it yet
+# @param dataset - BirthdayData read from the data files, whose parts are built only when they cannot be linked
+# @param path - folder of the mapped copy, from mapped_path
+# @param previous - folder of an earlier mapped copy, or None
+# @param unchanged - names of the parts (e.g. "players.arrow", "prefix_sums") whose data files are the same as previous's
+def write_mapped(dataset, path, previous=None, unchanged=()):
+    temporary = f"{path}.tmp-{os.getpid()}"
+    shutil.rmtree(temporary, ignore_errors=True)
+    os.makedirs(temporary)
+
+    parts = {
+        "players.arrow": lambda target: feather.write_feather(dataset.players, target, compression="uncompressed"),
+        "prefix_sums": lambda target: save_arrays(dataset.prefix_sums, target),
+        "birthdate_index": lambda target: save_arrays(dataset.birthdate_index, target),
+        "name_index": lambda target: save_arrays(dataset.name_index, target),
+        "similarity_index": lambda target: save_arrays(dataset.similarity_index, target),
+    }
+    for hof_only, pitchers_only in ERA_FILTERS:
+        parts[era_sums_name(hof_only, pitchers_only)] = lambda target, key=(hof_only, pitchers_only): save_arrays(dataset.era_sums(*key), target)
+
+    for name, write in parts.items():
+        if previous is None or name not in unchanged or not link_part(f"{previous}/{name}", f"{temporary}/{name}"):
+            write(f"{temporary}/{name}")
+
+    try:
+        os.rename(temporary, path)
+    except OSError:
+        shutil.rmtree(temporary, ignore_errors=True)
+
+    parent = os.path.dirname(path)
+    older = []
+    for name in os.listdir(parent):
+        if re.fullmatch(r"[0-9a-f]{16}", name) and name != os.path.basename(path):
+            try:
+                older.append((os.path.getmtime(f"{parent}/{name}"), f"{parent}/{name}"))
+            except FileNotFoundError:
+                # Removed by another process in the meantime
+                pass
+    for _, folder in sorted(older)[:-1]:
+        shutil.rmtree(folder, ignore_errors=True)
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+
+# Sorted array of every player's full birth date, searched with binary search to find the players born closest to any date
+class BirthdateIndex:
+
+    # @param players - dataframe of all players with Born, month, and day columns
+    def __init__(self, players):
+        birthdates = pd.to_datetime(pd.DataFrame({"year": players["Born"], "month": players["month"], "day": players["day"]}))
+        # Each player's birth date, in the order of the player table
+        self.birthdates = birthdates.to_numpy().astype("datetime64[D]")
+        days = self.birthdates.astype(np.int64)
+
+        # Players born on the same date keep the order of the player table whichever direction the search walks:
+        # order_after lists them first to last for walking forwards, order_before last to first for walking backwards
+        rows = np.arange(len(days))
+        self.order_after = np.lexsort((rows, days))
+        self.order_before = np.lexsort((-rows, days))
+        self.days = days[self.order_after]
+
+    # Finds the k players born closest to each of many dates in one vectorized call
+    # Ties in distance list players born on or after the date before those born earlier
+    # @param dates - list or array of datetime.date values (or numpy datetime64)
+    # @param k - number of players to return per date
+    # return - array of shape (number of dates, k) holding row positions in the player table, closest first
+    def nearest_batch(self, dates, k=5):
+        k = min(k, len(self.days))
+        targets = np.asarray(dates, dtype="datetime64[D]").astype(np.int64).reshape(-1)
+
+        # The k nearest players always lie within k positions on either side of the insertion point
+        positions = np.searchsorted(self.days, targets)
+        steps = np.arange(-k, k)
+        window = positions[:, None] + steps
+        valid = (window >= 0) & (window < len(self.days))
+        window = np.clip(window, 0, len(self.days) - 1)
+
+        # Rank by distance, then on or after the date before earlier, then by how far the search walked to reach the player
+        before = steps < 0
+        offsets = self.days[window] - targets[:, None]
+        rank = (2 * np.abs(offsets) + before) * (2 * k) + np.where(before, -steps - 1, steps)
+        rank = np.where(valid, rank, np.iinfo(np.int64).max)
+        best = np.argsort(rank, axis=1, kind="stable")[:, :k]
+
+        chosen = np.take_along_axis(window, best, axis=1)
+        return np.where(before[best], self.order_before[chosen], self.order_after[chosen])
+
+    # Finds the k players born closest to a date in O(log n + k log k)
+    # @param date - datetime.date value representing the target day
+    # @param k - number of players to return
+    # return - array of k row positions in the player table, closest first
+    def nearest(self, date, k=5):
+        return self.nearest_batch([date], k)[0]
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+from birthdays.days import day_of_year
+
+# The zodiac signs as (name, first day, last day), with days as (month, day); Capricorn wraps around the end of the year
+ZODIAC_SIGNS = [
+    ("Capricorn", (12, 22), (1, 19)), ("Aquarius", (1, 20), (2, 18)), ("Pisces", (2, 19), (3, 20)),
+    ("Aries", (3, 21), (4, 19)), ("Taurus", (4, 20), (5, 20)), ("Gemini", (5, 21), (6, 20)),
+    ("Cancer", (6, 21), (7, 22)), ("Leo", (7, 23), (8, 22)), ("Virgo", (8, 23), (9, 22)),
+    ("Libra", (9, 23), (10, 22)), ("Scorpio", (10, 23), (11, 21)), ("Sagittarius", (11, 22), (12, 21)),
+]
+
+# Cumulative sums over the days of the year of per-day columns, so any range of days is summed in O(1)
+# Ranges ending before they start wrap around the end of the year, e.g. December 22 through January 19
+class PrefixSums:
+
+    # @param daily - dataframe with one row per day of the year, e.g. from daily_sums
+    def __init__(self, daily):
+        self.columns = daily.columns
+        values = daily.to_numpy(dtype=float)
+        self.days = len(values)
+        self.prefix = np.vstack([np.zeros((1, values.shape[1])), np.cumsum(values, axis=0)])
+
+    # Sums every column over a range of days
+    # @param start_day - first day_of_year in the range
+    # @param end_day - last day_of_year in the range, included
+    # return - series with the range's sum of each column
+    def range_sums(self, start_day, end_day):
+        if start_day <= end_day:
+            total = self.prefix[end_day + 1] - self.prefix[start_day]
+        else:
+            total = self.prefix[-1] - self.prefix[start_day] + self.prefix[end_day + 1]
+        return pd.Series(total, index=self.columns)
+
+    # Sums every column over a window of days around each day, wrapping around the end of the year
+    # @param window - number of days in each window; the window is centered on its day, one day later when its length is even
+    # return - dataframe with one row per day of the year holding the window's sums
+    def rolling_sums(self, window):
+        window = min(max(int(window), 1), self.days)
+        starts = (np.arange(self.days) - (window - 1) // 2) % self.days
+        ends = (starts + window - 1) % self.days
+
+        # A window that wraps adds the year's full sum back in
+        wraps = (ends < starts)[:, None]
+        sums = self.prefix[ends + 1] - self.prefix[starts] + np.where(wraps, self.prefix[-1], 0)
+        return pd.DataFrame(sums, columns=self.columns)
+
+# Sums one per-day array over a window of days around each day, see PrefixSums.rolling_sums
+# @param values - array with one value per day of the year
+# @param window - number of days in each window
+# return - array of the window sums
+def rolling_sum(values, window):
+    return PrefixSums(pd.DataFrame({"value": values})).rolling_sums(window)["value"].to_numpy()
+
+# The first and last day_of_year of each zodiac sign
+# return - list of (name, start_day, end_day)
+def zodiac_ranges():
+    return [(name, day_of_year(*first), day_of_year(*last)) for name, first, last in ZODIAC_SIGNS]
@@ -0,0 +1,25 @@
+import numpy as np
+
+# Returns the k best or worst days for a statistic without sorting every day
+# Days are selected with a partition and only the k chosen days are sorted
+# Ties are broken by the earlier day of the year, and days with no value (NaN) always rank last
+# @param values - array with one value per day of the year
+# @param k - number of days to return
+# @param largest - True for the highest values first, False for the lowest values first
+# return - array of up to k day_of_year indices, best first
+def rank_days(values, k, largest=True):
+    values = np.asarray(values, dtype=float)
+    key = -values if largest else values
+    key = np.where(np.isnan(key), np.inf, key)
+
+    k = min(k, len(key))
+    if k <= 0:
+        return np.array([], dtype=np.intp)
+
+    # Every day strictly better than the kth value is in; the earliest days tied with it fill the remaining spots
+    threshold = np.partition(key, k - 1)[k - 1]
+    better = np.flatnonzero(key < threshold)
+    tied = np.flatnonzero(key == threshold)[:k - len(better)]
+    chosen = np.concatenate([better, tied])
+
+    return chosen[np.lexsort((chosen, key[chosen]))]
@@ -0,0 +1,27 @@
+# Compact column types for the player table, sized to each column's range
+# Years and counting stats fit in int16 (the largest, Cy Young's 22,068 outs pitched, is under its 32,767 limit)
+# IP is stored as a whole number of outs so sums of it are exact; it is shown in baseball notation (65.1) only for display
+# Rate stats are float32; WAR stays float64 so "Players Over _ WAR" compares exactly against the minimum the user types in
+PLAYER_DTYPES = {
+    "Name": "category", "HOF": "bool", "Born": "int16", "Seasons": "int16", "From": "int16", "To": "int16",
+    "WAR": "float64", "ASG": "int16", "G_bat": "int16", "AB": "int16", "R": "int16", "H": "int16", "HR": "int16",
+    "RBI": "int16", "SB": "int16", "BB": "int16", "BA": "float32", "OBP": "float32", "SLG": "float32", "OPS": "float32",
+    "OPS+": "int16", "W": "int16", "L": "int16", "ERA": "float32", "ERA+": "float32", "WHIP": "float32",
+    "G_pit": "int16", "GS": "int16", "SV": "int16", "IP": "int16", "SO": "int16", "Franchises": "category",
+    "month": "int8", "day": "int8", "day_of_year": "int16",
+}
+
+# Converts a player table read from the CSVs to the compact schema
+# The " HOF" suffix the site adds to names becomes a separate HOF column
+# @param players - dataframe of players in the CSV layout, with month, day, and day_of_year columns
+# return - a new dataframe with the columns of PLAYER_DTYPES, in that order
+def compact_players(players):
+    names = players["Name"].astype(str)
+    players = players.assign(Name=names.str.removesuffix(" HOF"), HOF=names.str.endswith(" HOF"))
+    return players[list(PLAYER_DTYPES)].astype(PLAYER_DTYPES)
+
+# Names as the site shows them, with " HOF" after Hall of Famers
+# @param players - dataframe with Name and HOF columns
+# return - series of display names
+def display_names(players):
+    return players["Name"].astype(str) + players["HOF"].map({True: " HOF", False: ""}).astype(str)
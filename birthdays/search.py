@@ -0,0 +1,60 @@
+import re
+import unicodedata
+
+import numpy as np
+
+# Largest code point, appended to a prefix to find the end of the keys starting with it
+PREFIX_END = "\U0010ffff"
+
+# Lowercases a name and strips accents and punctuation so searches match however they are typed, e.g. "José" and "jose",
+# "J.D." and "jd", and each half of a hyphenated name as its own word
+# @param text - a name or search query
+# return - string of words separated by single spaces
+def normalize_name(text):
+    decomposed = unicodedata.normalize("NFKD", str(text))
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+    stripped = re.sub(r"[.'’]", "", stripped)
+    return " ".join(re.sub(r"[^\w]+", " ", stripped).split())
+
+# Sorted array of every player's normalized name, starting from each word of it, searched with binary search for prefix matches
+# A query matches a player when it is the start of their full name or of the part of it from any later word, e.g. "gri" and "ken gri"
+# both match "Ken Griffey"
+class NameIndex:
+
+    # @param players - dataframe of all players with Name and WAR columns
+    def __init__(self, players):
+        keys = []
+        rows = []
+        later_words = []
+        for row, name in enumerate(players["Name"].astype(str)):
+            words = normalize_name(name).split(" ")
+            for i in range(len(words)):
+                keys.append(" ".join(words[i:]))
+                rows.append(row)
+                later_words.append(i > 0)
+
+        order = np.argsort(np.array(keys), kind="stable")
+        self.keys = np.array(keys)[order]
+        self.rows = np.array(rows, dtype=np.int64)[order]
+
+        # Matches on the full name come before matches on a later word, then players with more WAR, then table order
+        war = players["WAR"].to_numpy()[self.rows]
+        # ranked lists the keys best first, and rank is each key's place in it
+        self.ranked = np.lexsort((self.rows, -war, np.array(later_words)[order]))
+        self.rank = np.empty(len(self.ranked), dtype=np.int64)
+        self.rank[self.ranked] = np.arange(len(self.ranked))
+
+    # Finds the players whose names start with a query
+    # @param query - any part of a name from the start of a word, typed in any case and with or without accents
+    # @param k - maximum number of players to return
+    # return - array of up to k row positions in the player table, best match first
+    def search(self, query, k=10):
+        query = normalize_name(query)
+        if not query:
+            return np.array([], dtype=np.int64)
+
+        start, end = np.searchsorted(self.keys, [query, query + PREFIX_END])
+        rows = self.rows[self.ranked[np.sort(self.rank[start:end])]]
+        # A player can match more than one word (e.g. "jo" in "John Johnson"); only their best match is kept
+        _, first = np.unique(rows, return_index=True)
+        return rows[np.sort(first)][:k]
@@ -0,0 +1,285 @@
+# Headless JSON query service over the birthday dataset, for frontends other than the Streamlit page
+# Every query is answered from memory; when data_extraction.py writes new data, the next request loads it, keeping what did not change.
+# Responses carry an ETag of the data version, so clients revalidating with If-None-Match get an empty 304 until the data changes
+# Run from the repository root: python -m birthdays.service [--host 127.0.0.1] [--port 8000] [--data Data]
+#
+# Endpoints (all GET or HEAD):
+#     /health                                          data version and player count
+#     /players?month=7&day=4                           players born on a day
+#     /players?month=7&day=4&as_of=2026-05-01          players born on a day as the last scrape up to a date recorded them
+#     /closest?date=1990-05-17&k=5                     players born closest to a date
+#     /search?q=jose&k=10                              players whose names start with a query, ignoring case and accents
+#     /daily?stat=WAR&kind=total                       one total or average per day of the year (kind is total or average)
+#     /daily?stat=Players Over _ WAR&war_min=20        players over a career WAR on each day
+#     /history?month=7&day=4&stat=WAR&kind=total       a day's total or average after every recorded scrape
+#     /stats                                           statistics accepted by /daily and /history
+
+import argparse
+import datetime
+import functools
+import http.server
+import json
+import math
+import threading
+import urllib.parse
+
+import numpy as np
+
+from birthdays.aggregates import outs_to_notation
+from birthdays.dataset import RATE_STATS, DataStore
+from birthdays.days import MONTH_LENGTHS, day_of_year
+from birthdays.schema import display_names
+
+# Responses kept per distinct query; each QueryService answers from one version of the data, so a kept response never goes stale
+RESPONSE_CACHE_SIZE = 1024
+
+# Raised by a query for a bad or missing parameter, answered with 400
+class QueryError(ValueError):
+    pass
+
+# Reads an integer query parameter
+# @param params - dictionary of query parameters
+# @param name - parameter name
+# @param default - value when the parameter is missing, or None to require it
+# @param low - smallest accepted value
+# @param high - largest accepted value
+def int_param(params, name, default=None, low=None, high=None):
+    if name not in params:
+        if default is None:
+            raise QueryError(f"missing parameter: {name}")
+        return default
+    try:
+        value = int(params[name])
+    except ValueError:
+        raise QueryError(f"{name} must be an integer")
+    if (low is not None and value < low) or (high is not None and value > high):
+        raise QueryError(f"{name} must be between {low} and {high}")
+    return value
+
+# Reads a date query parameter
+# @param params - dictionary of query parameters
+# @param name - parameter name
+# return - datetime.date
+def date_param(params, name):
+    if name not in params:
+        raise QueryError(f"missing parameter: {name}")
+    try:
+        return datetime.date.fromisoformat(params[name])
+    except ValueError:
+        raise QueryError(f"{name} must be YYYY-MM-DD")
+
+# Converts players to JSON records, with rate stats rounded to their stored precision and IP in baseball notation
+# @param players - dataframe of players in the compact schema
+# return - list of dictionaries, one per player
+def player_records(players):
+    shown = players.drop(columns=["month", "day", "day_of_year"]).astype({stat: "float64" for stat in RATE_STATS}).round(3)
+    shown = shown.assign(Name=players["Name"].astype(str), IP=outs_to_notation(players["IP"]))
+    return json.loads(shown.to_json(orient="records"))
+
+# Answers queries against one BirthdayData with JSON bodies
+# Player records, display names, and birthdates are converted for JSON once up front, so a query only picks out rows
+class QueryService:
+
+    # @param dataset - BirthdayData to answer from
+    def __init__(self, dataset):
+        self.dataset = dataset
+        self.etag = f'"{dataset.version}"'
+
+        players = dataset.players
+        records = player_records(players)
+        day_rows = players.groupby("day_of_year").indices
+        self.day_records = [[records[row] for row in day_rows.get(day, [])] for day in range(366)]
+
+        self.names = display_names(players).to_numpy()
+        self.war = players["WAR"].to_numpy()
+        self.birthdates = dataset.birthdate_index.birthdates
+        self.months = players["month"].to_numpy()
+        self.days = players["day"].to_numpy()
+        self.routes = {"/health": self.health, "/players": self.players, "/closest": self.closest, "/search": self.search, "/daily": self.daily,
+                       "/history": self.history, "/stats": self.stats}
+        self.respond = functools.lru_cache(maxsize=RESPONSE_CACHE_SIZE)(self._respond)
+
+    # Answers a query
+    # @param path - path of the request, e.g. "/players"
+    # @param query - query parameters as a sorted tuple of (name, value) pairs, so equal queries share a cache entry
+    # return - tuple of the HTTP status and the JSON body as bytes
+    def _respond(self, path, query):
+        route = self.routes.get(path)
+        if route is None:
+            return 404, json.dumps({"error": f"unknown path: {path}"}).encode()
+        try:
+            return 200, json.dumps(route(dict(query)), separators=(",", ":")).encode()
+        except QueryError as e:
+            return 400, json.dumps({"error": str(e)}).encode()
+
+    def health(self, params):
+        return {"version": self.dataset.version, "players": len(self.dataset.players)}
+
+    def stats(self, params):
+        totals, avgs, _ = self.dataset.cube
+        return {"total": sorted(totals) + ["Players Over _ WAR"], "average": sorted(avgs)}
+
+    def players(self, params):
+        month = int_param(params, "month", low=1, high=12)
+        day = int_param(params, "day", low=1, high=MONTH_LENGTHS[month - 1])
+
+        if "as_of" not in params:
+            return {"month": month, "day": day, "players": self.day_records[day_of_year(month, day)]}
+
+        as_of = date_param(params, "as_of")
+        snapshot = self.dataset.history.snapshot(as_of)
+        players = player_records(snapshot[snapshot["day_of_year"].to_numpy() == day_of_year(month, day)])
+        return {"month": month, "day": day, "as_of": as_of.isoformat(), "players": players}
+
+    def closest(self, params):
+        date = date_param(params, "date")
+        k = int_param(params, "k", default=5, low=1, high=100)
+
+        rows = self.dataset.birthdate_index.nearest(date, k)
+        born = self.birthdates[rows]
+        days_apart = (born - np.datetime64(date, "D")).astype(np.int64)
+        closest = [{"name": name, "war": war, "born": str(b), "days_apart": apart} for name, war, b, apart in zip(self.names[rows].tolist(), self.war[rows].tolist(), born, days_apart.tolist())]
+        return {"date": date.isoformat(), "players": closest}
+
+    def search(self, params):
+        if not params.get("q"):
+            raise QueryError("missing parameter: q")
+        k = int_param(params, "k", default=10, low=1, high=100)
+
+        rows = self.dataset.name_index.search(params["q"], k)
+        born = self.birthdates[rows]
+        players = [{"name": name, "war": war, "born": str(b), "month": month, "day": day} for name, war, b, month, day in zip(self.names[rows].tolist(), self.war[rows].tolist(), born, self.months[rows].tolist(), self.days[rows].tolist())]
+        return {"q": params["q"], "players": players}
+
+    # Reads the stat and kind parameters of /daily and /history
+    # return - tuple of the statistic and whether it is an average
+    def stat_params(self, params):
+        stat = params.get("stat")
+        kind = params.get("kind", "total")
+        if kind not in ["total", "average"]:
+            raise QueryError("kind must be total or average")
+
+        available = self.stats({})[kind]
+        if stat not in available:
+            raise QueryError(f"stat must be one of: {', '.join(available)}")
+        return stat, kind == "average"
+
+    def daily(self, params):
+        stat, is_avg = self.stat_params(params)
+
+        try:
+            war_min = float(params.get("war_min", 0))
+        except ValueError:
+            raise QueryError("war_min must be a number")
+
+        values = self.dataset.daily_values(stat, is_avg, war_min)
+        # Days with nothing to average over have no value
+        return {"stat": stat, "kind": params.get("kind", "total"), "values": [None if math.isnan(value) else value for value in values.tolist()]}
+
+    def history(self, params):
+        month = int_param(params, "month", low=1, high=12)
+        day = int_param(params, "day", low=1, high=MONTH_LENGTHS[month - 1])
+        stat, is_avg = self.stat_params(params)
+        if stat == "Players Over _ WAR":
+            raise QueryError("stat must be a column of the player table")
+
+        series = self.dataset.history.day_series(stat, is_avg, day_of_year(month, day))
+        runs = [{"run": run.isoformat(), "value": None if math.isnan(value) else value} for run, value in zip(series.index, series.tolist())]
+        return {"month": month, "day": day, "stat": stat, "kind": params.get("kind", "total"), "runs": runs}
+
+# The QueryService of the newest data in a DataStore
+# When the store loads new data, one request builds its service while any others are answered from the old one until it is ready
+class LatestService:
+
+    # @param store - DataStore to answer from
+    def __init__(self, store):
+        self.store = store
+        self.lock = threading.Lock()
+        self.service = QueryService(store.get())
+
+    # return - QueryService of the newest data
+    def get(self):
+        dataset = self.store.get()
+        if dataset is not self.service.dataset and self.lock.acquire(blocking=False):
+            try:
+                if dataset is not self.service.dataset:
+                    self.service = QueryService(dataset)
+            finally:
+                self.lock.release()
+        return self.service
+
+# Builds the request handler class for a service
+# @param services - LatestService to answer from
+def make_handler(services):
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        # Keep-alive, so a client can send many queries over one connection; without Nagle's algorithm the body
+        # is not held back waiting for the client to acknowledge the headers
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            self.answer(send_body=True)
+
+        # Same headers as GET without the body
+        def do_HEAD(self):
+            self.answer(send_body=False)
+
+        # @param send_body - False to send only the headers
+        def answer(self, send_body):
+            service = services.get()
+            url = urllib.parse.urlsplit(self.path)
+            query = tuple(sorted(urllib.parse.parse_qsl(url.query)))
+
+            # Answered (from the response cache when asked before) even when revalidating, so a bad query still gets its 400
+            status, body = service.respond(url.path, query)
+            if status == 200 and self.headers.get("If-None-Match") == service.etag:
+                self.send_response(304)
+                self.send_header("ETag", service.etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            if status == 200:
+                self.send_header("ETag", service.etag)
+                self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+            if send_body:
+                self.wfile.write(body)
+
+        # Requests are not logged one by one, which would cost more than answering them
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+# Loads the dataset and its indexes, then serves queries until interrupted, reloading the data whenever it changes
+# @param host - address to listen on
+# @param port - port to listen on
+# @param directory - folder with the files data_extraction.py writes
+def serve(host="127.0.0.1", port=8000, directory="Data"):
+    store = DataStore(directory)
+    dataset = store.get()
+    # Build everything up front so the first queries are as fast as the rest; reloads build whatever was built before them
+    dataset.day_tables, dataset.cube, dataset.birthdate_index, dataset.name_index, dataset.version
+
+    server = http.server.ThreadingHTTPServer((host, port), make_handler(LatestService(store)))
+    print(f"Serving data version {dataset.version} on http://{host}:{server.server_address[1]}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="JSON query service over the birthday dataset")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--data", default="Data", help="folder with the files data_extraction.py writes")
+    args = parser.parse_args()
+
+    serve(args.host, args.port, args.data)
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+
+# Career columns players are compared on
+SIMILARITY_COLUMNS = ["WAR", "ASG", "G_bat", "AB", "H", "HR", "RBI", "SB", "BB", "OPS+", "W", "L", "ERA+", "SV", "IP", "SO"]
+
+# Number of most similar players precomputed for every player by data_extraction.py
+SIMILAR_N = 10
+
+# Players compared at once by SimilarityIndex.similar_batch, bounding its memory to a block of distances
+BLOCK_SIZE = 256
+
+# Every player's career columns, each standardized to mean 0 and standard deviation 1 so no one column's scale outweighs the rest,
+# searched for the players whose careers are closest in Euclidean distance
+# Distances to every player are estimated with one matrix product, and only the few closest are then measured exactly, so a search
+# is a handful of vectorized steps and ties come out the same however many players are searched at once
+class SimilarityIndex:
+
+    # @param players - dataframe of all players with the SIMILARITY_COLUMNS
+    def __init__(self, players):
+        features = players[SIMILARITY_COLUMNS].to_numpy(dtype=float)
+        # Columns every player has the same value in count for nothing rather than dividing by zero
+        scale = np.where(features.std(axis=0) > 0, features.std(axis=0), 1)
+        # Each player's standardized features, in the order of the player table
+        self.features = (features - features.mean(axis=0)) / scale
+        self.squares = (self.features ** 2).sum(axis=1)
+
+    # Finds the k players closest to each of some players
+    # Ties in distance are broken by the order of the player table
+    # @param players - array of row positions in the player table, each left out of its own results
+    # @param k - number of players to return per player
+    # return - tuple of arrays of shape (number of players, k): row positions, closest first, and their distances
+    def closest(self, players, k):
+        k = min(k, len(self.features) - 1)
+        # |a - b|^2 = |a|^2 + |b|^2 - 2ab, off from the exact distance only by rounding
+        estimates = self.squares[players, None] + self.squares[None, :] - 2 * self.features[players] @ self.features.T
+        estimates[np.arange(len(players)), players] = np.inf
+        closest = np.argpartition(estimates, k - 1, axis=1)[:, :k]
+        kth = np.take_along_axis(estimates, closest, axis=1).max(axis=1)
+        within = estimates <= (kth + 1e-9 * (self.squares.max() + 1))[:, None]
+
+        # Most players have exactly k candidates within rounding of the k-th estimate, measured together
+        exact = ((self.features[closest] - self.features[players, None]) ** 2).sum(axis=2)
+        keep = np.lexsort((closest, exact), axis=1)
+        rows = np.take_along_axis(closest, keep, axis=1)
+        distances = np.take_along_axis(exact, keep, axis=1)
+
+        # Players with more (ties at the k-th place, like the many with a game or two and nothing else) are measured one at a time
+        for i in np.flatnonzero(within.sum(axis=1) > k).tolist():
+            candidates = np.flatnonzero(within[i])
+            exact = ((self.features[candidates] - self.features[players[i]]) ** 2).sum(axis=1)
+            keep = np.lexsort((candidates, exact))[:k]
+            rows[i], distances[i] = candidates[keep], exact[keep]
+
+        return rows, np.sqrt(distances)
+
+    # Finds the players whose careers are most like one player's
+    # @param row - row position of the player in the player table
+    # @param k - number of players to return
+    # return - tuple of arrays of k row positions in the player table, most similar first, and their distances
+    def similar(self, row, k=5):
+        rows, distances = self.closest(np.array([row]), k)
+        return rows[0], distances[0]
+
+    # Finds the k most similar players to every player, in blocks of BLOCK_SIZE, as data_extraction.py precomputes them
+    # @param k - number of players to return per player
+    # return - tuple of arrays of shape (number of players, k): row positions, most similar first, and their distances
+    def similar_batch(self, k=SIMILAR_N):
+        blocks = [self.closest(np.arange(start, min(start + BLOCK_SIZE, len(self.features))), k) for start in range(0, len(self.features), BLOCK_SIZE)]
+        return np.concatenate([rows for rows, _ in blocks]), np.concatenate([distances for _, distances in blocks])
+
+# Writes the SIMILAR_N most similar players to every player next to the raw data
+# @param players - dataframe of all players in the compact schema
+# @param directory - folder to write similar_players.parquet to
+def write_similar_players(players, directory="Data"):
+    rows, _ = SimilarityIndex(players).similar_batch()
+    similar = pd.DataFrame(rows.astype("int32"), columns=[f"similar_{i + 1}" for i in range(rows.shape[1])])
+    similar.to_parquet(f"{directory}/similar_players.parquet", index=False)
+
+# Reads the lists written by write_similar_players
+# @param directory - folder containing similar_players.parquet
+# return - array of shape (number of players, SIMILAR_N) of row positions in the player table, most similar first
+def load_similar_players(directory="Data"):
+    return pd.read_parquet(f"{directory}/similar_players.parquet").to_numpy(dtype=np.int64)
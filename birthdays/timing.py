@@ -0,0 +1,208 @@
+import contextlib
+import cProfile
+import datetime
+import functools
+import json
+import logging
+import os
+import pstats
+import threading
+import time
+
+# Set to a directory to save a cProfile capture of every app rerun and scraper run there, e.g. BIRTHDAYS_PROFILE=profiles
+PROFILE_ENV = "BIRTHDAYS_PROFILE"
+
+LOG = logging.getLogger("birthdays.timing")
+
+# Wall time, cache hits and misses, data sizes, and counters recorded over one app rerun or scraper run
+# Safe to record into from several threads at once
+class Timings:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.sections = {}
+        self.caches = {}
+        self.sizes = {}
+        self.counters = {}
+
+    # Times a block of code; time spent in a section nested inside another counts toward both
+    # @param name - name of the section
+    # @param cache - True when the block is a lookup in a cache, to report its hits and misses
+    @contextlib.contextmanager
+    def section(self, name, cache=False):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                section = self.sections.setdefault(name, {"calls": 0, "seconds": 0.0})
+                section["calls"] += 1
+                section["seconds"] += elapsed
+                if cache:
+                    self.caches.setdefault(name, {"calls": 0, "misses": 0})["calls"] += 1
+
+    # Records that a cached function had to be computed
+    def miss(self, name):
+        with self.lock:
+            self.caches.setdefault(name, {"calls": 0, "misses": 0})["misses"] += 1
+
+    # Records the size of a piece of data, e.g. a table's bytes or rows; a later size of the same name replaces it
+    def size(self, name, value):
+        with self.lock:
+            self.sizes[name] = int(value)
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    # return - dictionary of everything recorded, ready for json.dumps
+    def summary(self):
+        with self.lock:
+            return {
+                "total_ms": round((time.perf_counter() - self.started) * 1000, 3),
+                "sections": {name: {"calls": s["calls"], "ms": round(s["seconds"] * 1000, 3)} for name, s in self.sections.items()},
+                "caches": {name: {"calls": c["calls"], "hits": max(c["calls"] - c["misses"], 0), "misses": c["misses"]} for name, c in self.caches.items()},
+                "sizes": dict(self.sizes),
+                "counters": dict(self.counters),
+            }
+
+_local = threading.local()
+_default = Timings()
+
+# Starts recording a new run on the calling thread (Streamlit runs each rerun of a session on its own script thread)
+# return - the Timings that current() returns on this thread until the next start_run()
+def start_run():
+    _local.timings = Timings()
+    return _local.timings
+
+# Ends the run on the calling thread
+# return - the run's summary
+def finish_run():
+    timings = current()
+    _local.timings = None
+    return timings.summary()
+
+# The Timings of the run on the calling thread, or a process-wide one when no run is in progress, e.g. in batch jobs
+def current():
+    return getattr(_local, "timings", None) or _default
+
+# Times a block as a section of the run in progress, or as a run of its own, logged when it ends, when no run is in progress
+# (e.g. a Streamlit fragment rerunning by itself)
+# @param name - name of the section
+# @param event - name the run of its own is logged under
+@contextlib.contextmanager
+def section_run(name, event):
+    if getattr(_local, "timings", None) is not None:
+        with current().section(name):
+            yield
+        return
+
+    timings = start_run()
+    try:
+        with timings.section(name):
+            yield
+    finally:
+        log_summary(event, finish_run())
+
+# Wraps a cache decorator so every lookup is timed and counted as a hit or a miss in the current run
+# Used as @cached(st.cache_resource) or @cached(st.cache_data, max_entries=64); the cache itself is unchanged
+# @param cache - the cache decorator, e.g. st.cache_data
+# @param options - keyword arguments for the cache decorator
+# return - decorator for the function to cache, whose result keeps the cache's clear()
+def cached(cache, **options):
+    def decorate(func):
+        # Only runs when the cache has no value for the arguments; wraps() keeps the name, source, and
+        # parameters the cache uses to build its keys
+        @functools.wraps(func)
+        def compute(*args, **kwargs):
+            current().miss(func.__name__)
+            return func(*args, **kwargs)
+
+        lookup = cache(**options)(compute) if options else cache(compute)
+
+        @functools.wraps(func)
+        def call(*args, **kwargs):
+            with current().section(func.__name__, cache=True):
+                return lookup(*args, **kwargs)
+
+        call.clear = lookup.clear
+        return call
+
+    return decorate
+
+# Writes a summary as one JSON log line on the "birthdays.timing" logger, to stderr unless logging is configured elsewhere
+# @param event - what the summary covers, e.g. "rerun"
+# @param summary - dictionary from Timings.summary()
+def log_summary(event, summary):
+    if not LOG.hasHandlers():
+        LOG.addHandler(logging.StreamHandler())
+        LOG.setLevel(logging.INFO)
+        LOG.propagate = False
+    LOG.info(json.dumps({"event": event, **summary}))
+
+# Opt-in cProfile capture, enabled by setting BIRTHDAYS_PROFILE to a directory
+# cProfile only sees the thread that enables it, so each thread captures separately and save() merges the captures into one file
+# From Python 3.12 only one profiler can be active in a process at a time; a capture started while another is active (a scraper
+# worker during the run's own capture, or two app reruns at once) is skipped rather than failing the code it wraps
+class Profiler:
+
+    # @param label - start of the saved file's name, e.g. "rerun" or "scrape"
+    def __init__(self, label):
+        self.directory = os.environ.get(PROFILE_ENV)
+        self.label = label
+        self.profiles = []
+        self.active = None
+        self.lock = threading.Lock()
+
+    # Turns on a new profile on the calling thread
+    # return - the profile, or None when profiling is off or another profiler is already active
+    def enable(self):
+        if not self.directory:
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            return None
+        return profile
+
+    # Turns off a profile from enable() and keeps it for save()
+    def keep(self, profile):
+        if profile is not None:
+            profile.disable()
+            with self.lock:
+                self.profiles.append(profile)
+
+    # Profiles a block of code on the calling thread
+    @contextlib.contextmanager
+    def capture(self):
+        profile = self.enable()
+        try:
+            yield
+        finally:
+            self.keep(profile)
+
+    # Same as capture() for code that cannot be put in a with block, like the top level of the Streamlit script
+    def start(self):
+        self.active = self.enable()
+
+    def stop(self):
+        self.keep(self.active)
+        self.active = None
+
+    # Saves every capture as one pstats file, readable with python -m pstats or snakeviz
+    # return - path of the saved file, or None when profiling is off
+    def save(self):
+        if not self.directory or not self.profiles:
+            return None
+
+        stats = pstats.Stats(self.profiles[0])
+        for profile in self.profiles[1:]:
+            stats.add(profile)
+
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{self.label}-{datetime.datetime.now():%Y%m%d-%H%M%S-%f}.prof")
+        stats.dump_stats(path)
+        return path
@@ -0,0 +1,74 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+# Files written by data_extraction.py that queries are answered from
+DATA_FILES = ["birthdays.parquet", "daily_stats.parquet", "daily_sums.parquet", "day_year_sums.parquet", "top_contributors.parquet", "franchise_counts.parquet",
+              "similar_players.parquet"]
+
+# Written after every other data file, so a reader that sees a new version file can load the new data
+VERSION_FILE = "data_version.json"
+
+# @param path - file to hash
+# return - hex SHA-256 of the file's contents
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+# Short hash standing for the contents of every data file, which changes whenever any of them does
+# @param file_hashes - dictionary of each of DATA_FILES to its hex SHA-256
+# return - 16 hex digits
+def data_version(file_hashes):
+    digest = hashlib.sha256()
+    for name in DATA_FILES:
+        digest.update(bytes.fromhex(file_hashes[name]))
+    return digest.hexdigest()[:16]
+
+# Hashes the players born on each day, so a reader can tell which days changed between two versions
+# @param players - dataframe of all players in the compact schema
+# return - list of 366 hex hashes, one per day_of_year
+def day_hashes(players):
+    rows = pd.util.hash_pandas_object(players, index=False).to_numpy()
+    order = np.argsort(players["day_of_year"].to_numpy(), kind="stable")
+    bounds = np.searchsorted(players["day_of_year"].to_numpy()[order], np.arange(367))
+    return [hashlib.sha256(rows[order[bounds[day]:bounds[day + 1]]].tobytes()).hexdigest()[:16] for day in range(366)]
+
+# Records the hash of every data file, the overall version, and the hash of each day's players
+# Written through a temporary file so a reader never sees it half written
+# @param players - dataframe of all players, as written to birthdays.parquet
+# @param directory - folder holding the data files
+# return - the version dictionary written
+def write_data_version(players, directory="Data"):
+    files = {name: file_hash(f"{directory}/{name}") for name in DATA_FILES}
+    version = {"version": data_version(files), "files": files, "days": day_hashes(players)}
+
+    path = f"{directory}/{VERSION_FILE}"
+    with open(f"{path}.tmp", "w") as f:
+        json.dump(version, f, indent=1)
+    os.replace(f"{path}.tmp", path)
+    return version
+
+# @param directory - folder holding the data files
+# return - the dictionary written by write_data_version, or None if the data has no version file
+def read_data_version(directory="Data"):
+    try:
+        with open(f"{directory}/{VERSION_FILE}") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+# A cheap stand-in for the version file's contents that changes whenever the file is replaced, checked on every app rerun
+# @param directory - folder holding the data files
+# return - tuple of the version file's modification time and size, or None if there is none
+def version_stamp(directory="Data"):
+    try:
+        stat = os.stat(f"{directory}/{VERSION_FILE}")
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
@@ -4,49 +4,449 @@
 # In[1]:
 
 
+import numpy as np
 import pandas as pd
+import concurrent.futures
+import datetime
+import hashlib
+import io
+import json
+import os
 import time
 import random
+import sys
+import threading
+import urllib.error
+import urllib.request
+from lxml import etree
+
+from birthdays.aggregates import write_cube
+from birthdays.days import MONTH_LENGTHS
+from birthdays.history import append_history
+from birthdays.schema import compact_players
+from birthdays.timing import Profiler, Timings, log_summary
+from birthdays.versions import write_data_version
 
 
 # In[2]:
 
 
+# Page columns kept in the CSVs, keyed by their name on the page (repeated names get .1 like pd.read_html), with final names and types
+# Rk and the pitching H, HR, and BB columns are dropped; IP is parsed into a whole number of outs, so 65.1 innings is 196,
+# and written back to the CSVs in the page's notation (see day_csv)
+BIRTHDAY_COLUMNS = {
+    "Name": ("Name", "str"), "Born": ("Born", "int"), "Yrs": ("Seasons", "int"), "From": ("From", "int"), "To": ("To", "int"),
+    "WAR": ("WAR", "float"), "ASG": ("ASG", "int"), "G": ("G_bat", "int"), "AB": ("AB", "int"), "R": ("R", "int"), "H": ("H", "int"),
+    "HR": ("HR", "int"), "RBI": ("RBI", "int"), "SB": ("SB", "int"), "BB": ("BB", "int"), "BA": ("BA", "float"), "OBP": ("OBP", "float"),
+    "SLG": ("SLG", "float"), "OPS": ("OPS", "float"), "OPS+": ("OPS+", "int"), "W": ("W", "int"), "L": ("L", "int"), "ERA": ("ERA", "float"),
+    "ERA+": ("ERA+", "float"), "WHIP": ("WHIP", "float"), "G.1": ("G_pit", "int"), "GS": ("GS", "int"), "SV": ("SV", "int"), "IP": ("IP", "ip"),
+    "SO": ("SO", "int"), "Franchises": ("Franchises", "str"),
+}
+
+# Text of a table cell with runs of whitespace collapsed, as pd.read_html reads it
+def cell_text(cell):
+    return " ".join("".join(cell.itertext()).split())
+
+# Parses the birthdays table out of a page's HTML
+# Streams the page and stops at the end of the first table, so the rest of the page is never parsed
+# Only the kept columns are collected, and each is converted to its final type once
+# @param html - bytes of a birthdays page
+# return - dataframe of the day's players with the app's column names
+def parse_birthdays(html):
+    kept = None
+    columns = {}
+    in_table = False
+    in_head = False
+
+    for event, element in etree.iterparse(io.BytesIO(html), events=("start", "end"), tag=("table", "thead", "tr"), html=True, encoding="utf-8"):
+        if element.tag == "table":
+            if event == "end" and in_table:
+                break
+            in_table = True
+        elif element.tag == "thead":
+            in_head = event == "start"
+        elif event == "end" and in_table:
+            cells = [cell for cell in element if cell.tag in ("th", "td")]
+
+            if in_head or kept is None:
+                # Header row (the last row of thead, or the first row without one): number repeated names the way pd.read_html does,
+                # then note the positions of the kept columns
+                seen = {}
+                kept = []
+                for position, name in enumerate(cell_text(cell) for cell in cells):
+                    page_name = name if name not in seen else f"{name}.{seen[name]}"
+                    seen[name] = seen.get(name, 0) + 1
+                    if page_name in BIRTHDAY_COLUMNS:
+                        kept.append((position, *BIRTHDAY_COLUMNS[page_name]))
+                columns = {final_name: [] for _, final_name, _ in kept}
+
+            elif cells and cell_text(cells[0]) != "Rk":
+                # Repeated header rows inside the body start with Rk and are skipped
+                for position, final_name, kind in kept:
+                    if position >= len(cells):
+                        text = ""
+                    elif kind == "str" or len(cells[position]):
+                        text = cell_text(cells[position])
+                    else:
+                        # Fast path for plain numeric cells with no markup inside them
+                        text = cells[position].text or ""
+
+                    if kind == "str":
+                        columns[final_name].append(text)
+                    elif kind == "ip":
+                        # Read from the text, so thirds of an inning (.1 and .2) are counted exactly
+                        whole, _, thirds = text.strip().replace(",", "").partition(".")
+                        columns[final_name].append(int(whole or 0) * 3 + int(thirds or 0))
+                    else:
+                        # Blank cells (e.g. pitching stats for position players) become 0
+                        text = text.strip().replace(",", "")
+                        columns[final_name].append(float(text) if text else 0.0)
+
+            # Rows are no longer needed once read
+            element.clear()
+            while element.getprevious() is not None:
+                del element.getparent()[0]
+
+    if kept is None:
+        raise ValueError("No birthdays table found")
+
+    table = {}
+    for _, final_name, kind in kept:
+        if kind in ("int", "ip"):
+            table[final_name] = np.array(columns[final_name], dtype=np.int64)
+        elif kind == "float":
+            table[final_name] = np.array(columns[final_name], dtype=np.float64)
+        else:
+            table[final_name] = columns[final_name]
+
+    return pd.DataFrame(table)
+
 def pull_date(url):
-    # Pull the table from the page
-    table = pd.DataFrame(pd.read_html(url)[0])
-    
-    # Dropping and renaming columns, replacing null values with 0
-    table = table.drop(columns=["Rk", "H.1", "HR.1", "BB.1"]).rename(columns={"Yrs": "Seasons", "G": "G_bat", "G.1": "G_pit"}).fillna(0)
-    
-    # Changing data types from float to integer
-    table = table.astype({"R": "int", "H": "int", "HR": "int", "RBI": "int", "SB": "int", "BB": "int", "OPS+": "int", "W": "int", "L": "int", "G_pit": "int", "GS": "int", "SV": "int", "SO": "int"})
-    
-    # Converting innings pitched from .1 .2 to .33 .67
-    table["IP"] = table["IP"].astype(int) + table["IP"] * 10 % 5 / 3
-    
-    return table
+    return parse_birthdays(fetch_page(url))
+
+# Default fetch function for the scraper: downloads a page and returns its bytes
+# Raises urllib.error.HTTPError for error responses so fetch_with_retry can back off on 429 and 5xx
+def fetch_page(url):
+    request = urllib.request.Request(url, headers={"User-Agent": "baseball-birthdays data extraction"})
+    with urllib.request.urlopen(request, timeout=30) as response:
+        return response.read()
+
+# Token bucket shared by every fetch worker so the whole scraper stays under the site's request ceiling
+# Keep requests under 20 per minute (https://www.sports-reference.com/429.html)
+class RateLimiter:
+
+    # @param requests_per_minute - sustained request rate
+    # @param burst - number of requests that may be made back to back after an idle period
+    def __init__(self, requests_per_minute=20, burst=1):
+        self.interval = 60 / requests_per_minute
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) / self.interval)
+        self.updated = now
+
+    # Blocks until a request may be made
+    def acquire(self):
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) * self.interval
+            time.sleep(wait)
+
+    # Holds back every worker for the given number of seconds, e.g. after a 429
+    def pause(self, seconds):
+        with self.lock:
+            self._refill()
+            self.tokens = min(self.tokens, 0) - seconds / self.interval
+
+# Fetches a page through the rate limiter, retrying 429, 5xx, and connection errors with exponential backoff
+# @param fetch - function taking a url and returning the page's bytes
+# @param url - page to fetch
+# @param limiter - RateLimiter shared by all workers
+# @param max_retries - number of retries before the error is raised
+# @param backoff - seconds to wait before the first retry, doubled for each one after
+# return - tuple of the page's bytes and the number of retries it took
+def fetch_with_retry(fetch, url, limiter, max_retries=5, backoff=15):
+    for attempt in range(max_retries + 1):
+        limiter.acquire()
+        try:
+            return fetch(url), attempt
+        except urllib.error.HTTPError as e:
+            if (e.code != 429 and e.code < 500) or attempt == max_retries:
+                raise
+            retry_after = e.headers.get("Retry-After") if e.headers else None
+            delay = float(retry_after) if retry_after and retry_after.isdigit() else backoff * 2 ** attempt
+        except (urllib.error.URLError, TimeoutError, ConnectionError):
+            if attempt == max_retries:
+                raise
+            delay = backoff * 2 ** attempt
+
+        print(f"Retrying {url} in {delay:.0f}s")
+        limiter.pause(delay * random.uniform(1, 1.25))
 
 
 # In[3]:
 
-def scrape():
+MONTH_FOLDERS = ["January", "February", "March", "April", "May", "June", "July", "August", "September", "October", "November", "December"]
+
+MANIFEST_PATH = "Data/manifest.json"
+
+# Every day of the year as (month, day), in calendar order
+def all_month_days():
+    return [(i+1, j+1) for i in range(12) for j in range(MONTH_LENGTHS[i])]
+
+# Name of a day's CSV without the extension, also used as its key in the manifest
+def day_key(month, day):
+    return f"{MONTH_FOLDERS[month-1]}_{str(day).zfill(2)}"
+
+def day_path(month, day):
+    return f"Data/{MONTH_FOLDERS[month-1]}/{day_key(month, day)}.csv"
+
+# Converts a day's players to the CSV export, bytes for hashing and writing
+# IP is written in baseball notation (65.1) as on the page, so the CSVs read like innings; the player table keeps it in outs
+# @param day_df - dataframe of the day's players from parse_birthdays, with IP in outs
+# return - the CSV's bytes
+def day_csv(day_df):
+    outs = day_df["IP"]
+    notation = (outs // 3).astype(str) + "." + (outs % 3).astype(str)
+    return day_df.assign(IP=notation).to_csv(index=False, lineterminator="\n").encode("utf-8")
+
+# Reads a day's CSV written by day_csv, converting IP back to outs exactly
+# @param source - path or file-like object of the CSV
+# return - dataframe of the day's players, with IP in outs
+def read_day_csv(source):
+    day_df = pd.read_csv(source, dtype={"IP": str})
+    whole, _, thirds = day_df["IP"].str.partition(".").T.to_numpy()
+    return day_df.assign(IP=whole.astype(np.int64) * 3 + thirds.astype(np.int64))
+
+# Converts a manifest key back into (month, day)
+def parse_day_key(key):
+    folder, day = key.split("_")
+    return (MONTH_FOLDERS.index(folder) + 1, int(day))
+
+# Whether a day has players who appeared in the current or previous season
+# The previous season counts so players who have not appeared yet this year are still refreshed
+# Nearly every day has such a player (364 of the 366 days in the 2026 data, 358 counting only the current season), so this
+# saves few fetches; it matters mostly for ordering, putting days whose stats change first
+# @param day_df - dataframe of the day's players
+# @param season - the current season's year
+def has_active_players(day_df, season):
+    return bool((day_df["To"] >= season - 1).any())
 
-    month_lengths = [31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
-    month_folders = ["January", "February", "March", "April", "May", "June", "July", "August", "September", "October", "November", "December"]
+# Reads the manifest of per-day content hashes and fetch times, building it from the CSVs in Data/ if it does not exist yet
+# return - dictionary with "days" (key -> {"hash", "fetched", "active"}) and "pending" (keys left to fetch by an unfinished run)
+def load_manifest(path=MANIFEST_PATH):
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
 
+    season = datetime.date.today().year
+    manifest = {"days": {}, "pending": []}
+    for month, day in all_month_days():
+        with open(day_path(month, day), "rb") as f:
+            content = f.read()
+        manifest["days"][day_key(month, day)] = {
+            "hash": hashlib.sha256(content).hexdigest(),
+            "fetched": None,
+            "active": has_active_players(read_day_csv(io.BytesIO(content)), season),
+        }
+    return manifest
 
+# Writes the manifest through a temporary file so an interrupted run never leaves it half written
+def save_manifest(manifest, path=MANIFEST_PATH):
+    with open(f"{path}.tmp", "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(f"{path}.tmp", path)
+
+# Picks the days an incremental run should fetch, most important first
+# Days with active players are always due; other days are due once their last fetch is older than max_age_days
+# Since almost every day has active players, an incremental run still fetches nearly all of them; what it saves comes from
+# rewriting only the days whose content changed and from resuming an interrupted run rather than starting over
+# @param manifest - manifest dictionary from load_manifest
+# @param now - timezone-aware datetime of the run
+# @param max_age_days - how often days without active players are refreshed
+# return - list of day keys, active days first, then the days fetched longest ago
+def due_days(manifest, now, max_age_days):
+    cutoff = (now - datetime.timedelta(days=max_age_days)).isoformat()
+
+    due = []
+    for month, day in all_month_days():
+        entry = manifest["days"].get(day_key(month, day))
+        if entry is None or entry["active"] or entry["fetched"] is None or entry["fetched"] < cutoff:
+            due.append(day_key(month, day))
+
+    # Never-fetched days sort as the oldest
+    def priority(key):
+        entry = manifest["days"].get(key) or {"active": True, "fetched": None}
+        return (not entry["active"], entry["fetched"] or "")
+
+    return sorted(due, key=priority)
+
+# Fetches, parses, and saves one day; runs on a worker thread
+# The CSV is rewritten only if the parsed content changed
+# @param month - the month to fetch
+# @param day - the day to fetch
+# @param previous_hash - the day's content hash from the manifest, or None
+# @param now - timezone-aware datetime of the run
+# @param fetch - function taking a url and returning the page's bytes
+# @param limiter - RateLimiter shared by all workers
+# @param timings - Timings of the run, which gets the fetch, parse, and write times, retries, and bytes fetched
+# return - tuple of the day's new manifest entry, whether its CSV was rewritten, and the day's timing stats
+def refresh_day(month, day, previous_hash, now, fetch, limiter, timings):
+    start = time.perf_counter()
+    with timings.section("fetch"):
+        html, retries = fetch_with_retry(fetch, f"https://www.baseball-reference.com/friv/birthdays.cgi?month={month}&day={day}", limiter)
+    fetched = time.perf_counter()
+
+    with timings.section("parse"):
+        day_df = parse_birthdays(html)
+        content = day_csv(day_df)
+        content_hash = hashlib.sha256(content).hexdigest()
+
+    changed = previous_hash != content_hash
+    if changed:
+        with timings.section("write"), open(day_path(month, day), "wb") as f:
+            f.write(content)
+
+    timings.count("retries", retries)
+    timings.count("bytes_fetched", len(html))
+    timings.count("days_changed", changed)
+    stats = {
+        "fetch_ms": round((fetched - start) * 1000, 1),
+        "total_ms": round((time.perf_counter() - start) * 1000, 1),
+        "retries": retries,
+        "bytes": len(html),
+        "players": len(day_df),
+        "changed": changed,
+    }
+
+    entry = {
+        "hash": content_hash,
+        "fetched": now.isoformat(timespec="seconds"),
+        "active": has_active_players(day_df, now.year),
+    }
+    return entry, changed, stats
+
+# Scrapes the birthday pages into Data/, then rebuilds the consolidated file and aggregate cube and records what changed in the history
+# Days are fetched by a pool of workers sharing one rate limiter, so parsing and writing one day overlaps with waiting to fetch the next
+# The manifest is saved after every day, so a run that stops early resumes where it left off the next time scrape() runs
+# @param incremental - False to fetch all 366 days, True to fetch only the days picked by due_days()
+# @param max_age_days - in incremental mode, how often days without active players are refreshed
+# @param fetch - function taking a url and returning the page's bytes, replaceable to scrape a local stand-in
+# @param requests_per_minute - request ceiling shared by all workers
+# @param workers - number of days fetched and parsed at once
+# return - dictionary summarizing the run: time per stage, retries, bytes fetched, and per-day stats
+# Setting BIRTHDAYS_PROFILE to a directory also saves a cProfile capture of the run, workers included, there
+def scrape(incremental=False, max_age_days=28, fetch=fetch_page, requests_per_minute=20, workers=4):
+    timings = Timings()
+    profiler = Profiler("scrape")
+    profiler.start()
+
+    manifest = load_manifest()
+    now = datetime.datetime.now(datetime.timezone.utc)
+
+    if manifest["pending"]:
+        print(f"Resuming unfinished run with {len(manifest['pending'])} days left")
+    elif incremental:
+        manifest["pending"] = due_days(manifest, now, max_age_days)
+    else:
+        manifest["pending"] = [day_key(month, day) for month, day in all_month_days()]
+    save_manifest(manifest)
+
+    limiter = RateLimiter(requests_per_minute)
+    changed = 0
+    day_stats = {}
+
+    def refresh(month, day, previous_hash):
+        with profiler.capture():
+            return refresh_day(month, day, previous_hash, now, fetch, limiter, timings)
+
+    # Days are submitted in priority order and the workers take them first come, first served
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {}
+        for key in manifest["pending"]:
+            month, day = parse_day_key(key)
+            previous_hash = manifest["days"].get(key, {}).get("hash")
+            futures[executor.submit(refresh, month, day, previous_hash)] = key
+
+        try:
+            for future in concurrent.futures.as_completed(futures):
+                key = futures[future]
+                manifest["days"][key], day_changed, day_stats[key] = future.result()
+                manifest["pending"].remove(key)
+                save_manifest(manifest)
+                changed += day_changed
+        except BaseException:
+            # Days that were not finished stay pending in the manifest for the next run
+            executor.shutdown(wait=True, cancel_futures=True)
+            raise
+
+    print(f"{changed} day files changed")
+    with timings.section("consolidate"):
+        players = consolidate_csvs()
+    with timings.section("write_cube"):
+        write_cube(players)
+    with timings.section("append_history"):
+        history_rows = append_history(players, now)
+    # Last, so the app only picks up the new data once every file is written
+    with timings.section("write_data_version"):
+        write_data_version(players)
+
+    profiler.stop()
+    profiler.save()
+
+    timings.size("players", len(players))
+    timings.size("history_rows", history_rows)
+    return {**timings.summary(), "days": day_stats}
+
+
+# %%
+
+# Combines the per-day tables into one player table and writes it as a single Parquet file for the app to load
+# The per-day CSVs are still written by scrape() as an export format
+# @param all_days - list of 366 dataframes, one per day in calendar order (January 1 through December 31, including February 29)
+# @param path - location of the consolidated file
+# return - the combined dataframe in the compact schema, with month, day, and day_of_year columns added
+def write_consolidated(all_days, path="Data/birthdays.parquet"):
+
+    frames = []
+    day_of_year = 0
     for i in range(12):
-        folder = month_folders[i]
-        for j in range(month_lengths[i]):     
-            day = pull_date(f"https://www.baseball-reference.com/friv/birthdays.cgi?month={i+1}&day={j+1}")
-            day.to_csv(f"Data/{folder}/{folder}_{str(j+1).zfill(2)}.csv", index=False)
-            
-            # Keep requests under 20 per minute (https://www.sports-reference.com/429.html)
-            time.sleep(random.uniform(3.5, 5))
+        for j in range(MONTH_LENGTHS[i]):
+            # day_of_year is 0-indexed on a leap year calendar, matching the order of the Group Statistics graphs
+            frames.append(all_days[day_of_year].assign(month=i+1, day=j+1, day_of_year=day_of_year))
+            day_of_year += 1
+
+    players = compact_players(pd.concat(frames, ignore_index=True))
+    players.to_parquet(path, index=False)
+
+    return players
+
+# Rebuilds the consolidated file from the CSVs already in Data/ without scraping
+def consolidate_csvs():
+    all_days = [read_day_csv(day_path(month, day)) for month, day in all_month_days()]
+    return write_consolidated(all_days)
 
 
 
 # %%
 if __name__ == "__main__":
-    scrape()
\ No newline at end of file
+    if "--consolidate-only" in sys.argv:
+        players = consolidate_csvs()
+        write_cube(players)
+        write_data_version(players)
+        if not os.path.exists(MANIFEST_PATH):
+            save_manifest(load_manifest())
+    else:
+        summary = scrape(incremental="--incremental" in sys.argv)
+        log_summary("scrape", {key: value for key, value in summary.items() if key != "days"})
+        if "--summary" in sys.argv:
+            with open(sys.argv[sys.argv.index("--summary") + 1], "w") as f:
+                json.dump(summary, f, indent=2)
@@ -0,0 +1,79 @@
+import concurrent.futures
+import cProfile
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from birthdays import timing
+from birthdays.timing import PROFILE_ENV, Profiler
+
+# cProfile.Profile with the one-active-profiler rule Python 3.12 and later enforce, so the tests check it on any version
+class SingleProfile(cProfile.Profile):
+    lock = threading.Lock()
+    active = None
+
+    def enable(self, *args, **kwargs):
+        with SingleProfile.lock:
+            if SingleProfile.active is not None:
+                raise ValueError("Another profiling tool is already active")
+            SingleProfile.active = self
+        super().enable(*args, **kwargs)
+
+    def disable(self):
+        super().disable()
+        with SingleProfile.lock:
+            if SingleProfile.active is self:
+                SingleProfile.active = None
+
+def work():
+    return sum(i * i for i in range(1000))
+
+def test_capture_in_worker_while_started(tmp_path, monkeypatch):
+    monkeypatch.setenv(PROFILE_ENV, str(tmp_path))
+    profiler = Profiler("scrape")
+
+    profiler.start()
+    try:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=2) as pool:
+            def captured():
+                with profiler.capture():
+                    return work()
+
+            results = [future.result() for future in [pool.submit(captured) for _ in range(4)]]
+    finally:
+        profiler.stop()
+
+    assert results == [work()] * 4
+    path = profiler.save()
+    assert path is not None and os.path.exists(path)
+
+def test_capture_skipped_when_another_profiler_is_active(tmp_path, monkeypatch):
+    monkeypatch.setenv(PROFILE_ENV, str(tmp_path))
+    monkeypatch.setattr(timing.cProfile, "Profile", SingleProfile)
+    profiler = Profiler("scrape")
+
+    profiler.start()
+    try:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=2) as pool:
+            def captured():
+                with profiler.capture():
+                    return work()
+
+            results = [future.result() for future in [pool.submit(captured) for _ in range(4)]]
+    finally:
+        profiler.stop()
+
+    assert results == [work()] * 4
+    # Only the run's own profile was active, so it is the only capture kept
+    assert len(profiler.profiles) == 1
+    assert os.path.exists(profiler.save())
+
+    # A second rerun starting while the first is still profiling runs without its own capture
+    first, second = Profiler("rerun"), Profiler("rerun")
+    first.start()
+    second.start()
+    assert second.active is None
+    second.stop()
+    first.stop()
+    assert len(first.profiles) == 1 and not second.profiles